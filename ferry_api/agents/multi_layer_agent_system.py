@@ -48,7 +48,7 @@ class MultiLayerAgentSystem:
         start_time = time.time()
         
         if not session_id:
-            session_id = str(uuid.uuid4())
+            session_id = uuid.uuid4().hex
         
         logger.info(f"[{self.system_name}] 开始处理查询: {user_query}")
         
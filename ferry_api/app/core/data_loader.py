@@ -1,11 +1,23 @@
+import re
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pathlib import Path
 import logging
 from .config import settings
+from ..models.route import FerryRoute
 
 logger = logging.getLogger(__name__)
 
+TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+def parse_hhmm(value: str) -> Optional[int]:
+    """将"HH:MM"格式的时间转换为HHMM整数（如"14:30" -> 1430），格式不符时返回None"""
+    match = TIME_PATTERN.match(value.strip())
+    if not match:
+        return None
+    return int(match.group(1)) * 100 + int(match.group(2))
+
 class DataLoader:
     """数据加载器"""
     
@@ -14,6 +26,16 @@ class DataLoader:
         self.companies_df: pd.DataFrame = None
         self.ports_df: pd.DataFrame = None
         self.fares_df: pd.DataFrame = None
+        # 时间表的预编码列（与timetable_df行位置一一对应）
+        self.vehicle_flags: np.ndarray = None
+        self.bicycle_flags: np.ndarray = None
+        self.departure_hhmm: np.ndarray = None
+        # 预构建的全部航线对象（与timetable_df行位置一一对应）
+        self.routes_all: List[FerryRoute] = []
+        # 倒排索引：小写名称 -> 行位置数组
+        self.departure_index: Dict[str, np.ndarray] = {}
+        self.arrival_index: Dict[str, np.ndarray] = {}
+        self.company_index: Dict[str, np.ndarray] = {}
         self._load_all_data()
     
     def _load_all_data(self):
@@ -36,6 +58,7 @@ class DataLoader:
             if settings.TIMETABLE_CSV.exists():
                 self.timetable_df = pd.read_csv(settings.TIMETABLE_CSV)
                 logger.info(f"Loaded {len(self.timetable_df)} timetable records")
+                self._build_timetable_arrays()
             else:
                 logger.error(f"Timetable CSV not found: {settings.TIMETABLE_CSV}")
 
@@ -67,6 +90,71 @@ class DataLoader:
             logger.error(f"Error loading data: {e}")
             raise
     
+    def _build_timetable_arrays(self):
+        """预编码时间表的过滤列（“是/否”列为int8，出发时间为HHMM整数），并建立索引和航线对象"""
+        df = self.timetable_df
+        self.vehicle_flags = (df['允许车辆'].to_numpy() == "是").astype(np.int8)
+        self.bicycle_flags = (df['允许自行车'].to_numpy() == "是").astype(np.int8)
+        self.departure_hhmm = np.fromiter(
+            (parse_hhmm(str(value)) or 0 for value in df['出发时间'].to_numpy()),
+            dtype=np.int32,
+            count=len(df)
+        )
+        self.departure_index = self._build_inverted_index(df['出发地'])
+        self.arrival_index = self._build_inverted_index(df['到达地'])
+        self.company_index = self._build_inverted_index(df['运营公司'])
+        self.routes_all = self._build_routes(df)
+    
+    @staticmethod
+    def _build_routes(df: pd.DataFrame) -> List[FerryRoute]:
+        """将时间表一次性转换为FerryRoute列表，运行期间数据不变，可直接按行位置复用"""
+        if df.empty:
+            return []
+        
+        # 所有类型转换和空值处理都按列一次完成，循环内不再调用pandas
+        columns = zip(
+            df['出发地'].astype(str).tolist(),
+            df['到达地'].astype(str).tolist(),
+            df['出发时间'].astype(str).tolist(),
+            df['到达时间'].astype(str).tolist(),
+            df['运营公司'].astype(str).tolist(),
+            df['船只类型'].astype(str).tolist(),
+            (df['允许车辆'].to_numpy() == "是").tolist(),
+            (df['允许自行车'].to_numpy() == "是").tolist(),
+            df['大人票价'].astype(str).tolist(),
+            df['小人票价'].astype(str).tolist(),
+            df['运营日期'].astype(str).tolist(),
+            df['备注'].astype(str).where(df['备注'].notna(), None).tolist()
+        )
+        
+        # 数据来自已清洗的CSV，跳过pydantic逐行校验
+        return [
+            FerryRoute.model_construct(
+                departure_port=departure_port,
+                arrival_port=arrival_port,
+                departure_time=departure_time,
+                arrival_time=arrival_time,
+                company=company,
+                ship_type=ship_type,
+                allows_vehicles=allows_vehicles,
+                allows_bicycles=allows_bicycles,
+                adult_fare=adult_fare,
+                child_fare=child_fare,
+                operating_days=operating_days,
+                notes=notes
+            )
+            for (departure_port, arrival_port, departure_time, arrival_time, company, ship_type,
+                 allows_vehicles, allows_bicycles, adult_fare, child_fare, operating_days, notes) in columns
+        ]
+    
+    @staticmethod
+    def _build_inverted_index(column: pd.Series) -> Dict[str, np.ndarray]:
+        """按列值建立倒排索引，键为小写后的值，值为有序的行位置数组"""
+        positions: Dict[str, List[np.ndarray]] = {}
+        for value, rows in column.groupby(column.to_numpy(), sort=False).indices.items():
+            positions.setdefault(str(value).lower(), []).append(rows)
+        return {key: np.sort(np.concatenate(rows)) for key, rows in positions.items()}
+    
     def get_timetable_data(self) -> pd.DataFrame:
         """获取时间表数据"""
         return self.timetable_df.copy() if self.timetable_df is not None else pd.DataFrame()
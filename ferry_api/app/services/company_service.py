@@ -11,9 +11,18 @@ class CompanyService:
     
     def __init__(self):
         self.data_loader = data_loader
+        # 数据加载后只构建一次模型列表和名称索引
+        self._companies = self._build_companies()
+        self._by_name = {}
+        for company in self._companies:
+            self._by_name.setdefault(company.name, company)
     
     def get_all_companies(self) -> List[Company]:
         """获取所有船运公司"""
+        return list(self._companies)
+    
+    def _build_companies(self) -> List[Company]:
+        """构建所有船运公司模型列表"""
         try:
             df = self.data_loader.get_companies_data()
             
@@ -59,13 +68,7 @@ class CompanyService:
     
     def get_company_by_name(self, name: str) -> Optional[Company]:
         """根据名称获取公司"""
-        companies = self.get_all_companies()
-        
-        for company in companies:
-            if company.name == name:
-                return company
-        
-        return None
+        return self._by_name.get(name)
 
 # 全局服务实例
 company_service = CompanyService()
@@ -1,8 +1,13 @@
 import pandas as pd
 import os
+import hashlib
+import pickle
+import tempfile
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from ..models import island as island_models
 from ..models.island import (
     IslandTransport, BicycleRental, BusSchedule, OtherTransport,
     IslandTransportSummary, TransportType
@@ -10,12 +15,35 @@ from ..models.island import (
 
 logger = logging.getLogger(__name__)
 
+# 岛屿数据缓存格式版本，缓存内容的结构变化而源文件未变时递增
+CACHE_VERSION = 1
+
+# 各类CSV统一后的列，缺失的可选列以空字符串补齐
+BICYCLE_RENTAL_COLUMNS = [
+    'shop_name', 'location', 'bicycle_type', 'price_1day_yen', 'price_4hours_yen',
+    'price_overnight_yen', 'operating_hours', 'contact', 'notes', 'equipment', 'insurance'
+]
+BUS_SCHEDULE_COLUMNS = [
+    'bus_type', 'route', 'departure_stop', 'arrival_stop', 'departure_time', 'arrival_time',
+    'fare_adult_yen', 'fare_child_yen', 'operator', 'notes', 'frequency'
+]
+OTHER_TRANSPORT_COLUMNS = [
+    'transport_type', 'service_name', 'location', 'price_yen', 'operating_hours',
+    'contact', 'notes', 'capacity', 'requirements'
+]
+
 class IslandService:
     """岛屿交通信息服务"""
     
     def __init__(self):
-        self.data_dir = Path(__file__).parent.parent.parent / "data" / "islands"
+        base_dir = Path(__file__).parent.parent.parent
+        self.data_dir = base_dir / "data" / "islands"
+        # 缓存文件放在数据目录之外，不参与数据文件指纹的计算
+        self.cache_file = base_dir / ".cache" / "islands_cache.pkl"
         self.islands_data = {}
+        self._summaries: List[IslandTransportSummary] = []
+        self._by_name: Dict[str, IslandTransport] = {}
+        self._summary_loaded = set()
         self.load_all_islands_data()
     
     def load_all_islands_data(self):
@@ -29,17 +57,95 @@ class IslandService:
                 "ogijima": "男木岛"
             }
             
-            for folder_name, island_name in island_folders.items():
-                island_path = self.data_dir / folder_name
-                if island_path.exists():
-                    self.islands_data[folder_name] = self._load_island_data(island_path, island_name, folder_name)
-                    logger.info(f"Loaded data for {island_name}")
-                else:
-                    logger.warning(f"Island data folder not found: {island_path}")
+            # 数据文件未变化时直接使用上次构建的模型对象
+            fingerprint = self._data_fingerprint()
+            if self._load_from_cache(fingerprint):
+                self._build_indexes()
+                logger.info(f"Loaded data for {len(self.islands_data)} islands from cache")
+                return
+            
+            # 各岛屿的CSV读取互不依赖，并行加载以缩短启动时间
+            with ThreadPoolExecutor(max_workers=len(island_folders)) as executor:
+                futures = {}
+                for folder_name, island_name in island_folders.items():
+                    island_path = self.data_dir / folder_name
+                    if island_path.exists():
+                        futures[folder_name] = executor.submit(
+                            self._load_island_data, island_path, island_name, folder_name
+                        )
+                    else:
+                        logger.warning(f"Island data folder not found: {island_path}")
+
+                # 按固定顺序收集结果，保证返回列表顺序稳定
+                for folder_name, future in futures.items():
+                    self.islands_data[folder_name] = future.result()
+                    logger.info(f"Loaded data for {island_folders[folder_name]}")
+
+            self._build_indexes()
+            self._save_to_cache(fingerprint)
                     
         except Exception as e:
             logger.error(f"Error loading islands data: {e}")
     
+    def _build_indexes(self):
+        """数据加载后不再变化，预先计算摘要和名称索引"""
+        self._summaries = self._build_islands_summary()
+        self._by_name = {}
+        # 支持中文名和英文名查询
+        for island_data in self.islands_data.values():
+            self._by_name.setdefault(island_data.island_name, island_data)
+            self._by_name.setdefault(island_data.island_name_en, island_data)
+    
+    def _data_fingerprint(self) -> str:
+        """根据缓存版本、数据文件、本模块和数据模型模块的修改时间计算指纹"""
+        digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        sources = [Path(__file__), Path(island_models.__file__)] + sorted(
+            path for path in self.data_dir.rglob("*") if path.is_file()
+        )
+        for path in sources:
+            stat = path.stat()
+            digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+        return digest.hexdigest()
+    
+    def _load_from_cache(self, fingerprint: str) -> bool:
+        """从缓存文件加载岛屿数据，缓存不存在或已过期时返回False"""
+        if not self.cache_file.exists():
+            return False
+        try:
+            with open(self.cache_file, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get("fingerprint") != fingerprint:
+                return False
+            self.islands_data = cached["islands_data"]
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load islands cache: {e}")
+            return False
+    
+    def _save_to_cache(self, fingerprint: str):
+        """
+        将构建好的岛屿数据写入缓存文件
+        
+        先写入同目录下的临时文件再原子替换，多个进程同时启动时不会读到写了一半的缓存
+        """
+        tmp_path = None
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                'wb', dir=self.cache_file.parent, prefix=self.cache_file.name, suffix=".tmp", delete=False
+            ) as f:
+                tmp_path = f.name
+                pickle.dump(
+                    {"fingerprint": fingerprint, "islands_data": self.islands_data},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, self.cache_file)
+        except Exception as e:
+            logger.warning(f"Failed to write islands cache: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
     def _load_island_data(self, island_path: Path, island_name: str, island_name_en: str) -> IslandTransport:
         """加载单个岛屿数据"""
         try:
@@ -47,82 +153,85 @@ class IslandService:
             bicycle_rentals = []
             bicycle_file = island_path / "bicycle_rental.csv"
             if bicycle_file.exists():
-                df = pd.read_csv(bicycle_file)
-                for _, row in df.iterrows():
-                    if row['shop_name'] != 'no_bicycle_rental':  # 排除无租赁服务的记录
+                df = pd.read_csv(bicycle_file, dtype={'bicycle_type': 'category'})
+                # 整列解析价格，兼容不同的列名格式
+                df['price_1day_yen'] = self._parse_price_column(
+                    df, 'price_1day_yen', 'price_per_day_yen', 'price_day_yen'
+                )
+                df['price_4hours_yen'] = self._parse_price_column(df, 'price_4hours_yen')
+                df['price_overnight_yen'] = self._parse_price_column(df, 'price_overnight_yen')
+                df = df.reindex(columns=BICYCLE_RENTAL_COLUMNS, fill_value='')
+                for row in df.itertuples(index=False):
+                    if row.shop_name != 'no_bicycle_rental':  # 排除无租赁服务的记录
                         bicycle_rentals.append(BicycleRental(
-                            shop_name=str(row['shop_name']),
-                            location=str(row['location']),
-                            bicycle_type=str(row['bicycle_type']),
-                            price_1day_yen=self._parse_price(
-                                row.get('price_1day_yen') or
-                                row.get('price_per_day_yen') or
-                                row.get('price_day_yen')
-                            ),
-                            price_4hours_yen=self._parse_price(row.get('price_4hours_yen')),
-                            price_overnight_yen=self._parse_price(row.get('price_overnight_yen')),
-                            operating_hours=str(row['operating_hours']),
-                            contact=str(row['contact']),
-                            notes=str(row.get('notes', '')),
-                            equipment=str(row.get('equipment', '')),
-                            insurance=str(row.get('insurance', ''))
+                            shop_name=str(row.shop_name),
+                            location=str(row.location),
+                            bicycle_type=str(row.bicycle_type),
+                            price_1day_yen=row.price_1day_yen,
+                            price_4hours_yen=row.price_4hours_yen,
+                            price_overnight_yen=row.price_overnight_yen,
+                            operating_hours=str(row.operating_hours),
+                            contact=str(row.contact),
+                            notes=str(row.notes),
+                            equipment=str(row.equipment),
+                            insurance=str(row.insurance)
                         ))
             
             # 加载巴士时刻表数据
             bus_schedules = []
             bus_file = island_path / "bus_timetable.csv"
             if bus_file.exists():
-                df = pd.read_csv(bus_file)
-                for _, row in df.iterrows():
-                    # 处理不同的列名格式
-                    bus_type = row.get('bus_type') or row.get('bus_line') or row.get('transport_type', '')
-                    if bus_type != 'no_bus' and str(bus_type) != 'nan':  # 排除无巴士服务的记录
+                df = pd.read_csv(bus_file, dtype={'operator': 'category'})
+                # 处理不同的列名格式
+                bus_type_columns = [c for c in ('bus_type', 'bus_line', 'transport_type') if c in df.columns]
+                df['bus_type'] = df[bus_type_columns].bfill(axis=1).iloc[:, 0] if bus_type_columns else ''
+                df['fare_adult_yen'] = self._parse_price_column(df, 'fare_adult_yen', 'fare_yen')
+                df['fare_child_yen'] = self._parse_price_column(df, 'fare_child_yen')
+                df = df.reindex(columns=BUS_SCHEDULE_COLUMNS, fill_value='')
+                for row in df.itertuples(index=False):
+                    if row.bus_type != 'no_bus' and str(row.bus_type) != 'nan':  # 排除无巴士服务的记录
                         bus_schedules.append(BusSchedule(
-                            bus_type=str(bus_type),
-                            route=str(row['route']),
-                            departure_stop=str(row['departure_stop']),
-                            arrival_stop=str(row['arrival_stop']),
-                            departure_time=str(row.get('departure_time', '')),
-                            arrival_time=str(row.get('arrival_time', '')),
-                            fare_adult_yen=self._parse_price(row.get('fare_adult_yen') or row.get('fare_yen')),
-                            fare_child_yen=self._parse_price(row.get('fare_child_yen')),
-                            operator=str(row['operator']),
-                            notes=str(row.get('notes', '')),
-                            frequency=str(row.get('frequency', ''))
+                            bus_type=str(row.bus_type),
+                            route=str(row.route),
+                            departure_stop=str(row.departure_stop),
+                            arrival_stop=str(row.arrival_stop),
+                            departure_time=str(row.departure_time),
+                            arrival_time=str(row.arrival_time),
+                            fare_adult_yen=row.fare_adult_yen,
+                            fare_child_yen=row.fare_child_yen,
+                            operator=str(row.operator),
+                            notes=str(row.notes),
+                            frequency=str(row.frequency)
                         ))
             
             # 加载其他交通方式数据
             other_transports = []
             other_file = island_path / "other_transport.csv"
             if other_file.exists():
-                df = pd.read_csv(other_file)
-                for _, row in df.iterrows():
+                df = pd.read_csv(other_file, dtype={'transport_type': 'category'})
+                df['price_yen'] = self._parse_price_column(df, 'price_yen')
+                df = df.reindex(columns=OTHER_TRANSPORT_COLUMNS, fill_value='')
+                for row in df.itertuples(index=False):
                     other_transports.append(OtherTransport(
-                        transport_type=str(row['transport_type']),
-                        service_name=str(row['service_name']),
-                        location=str(row['location']),
-                        price_yen=self._parse_price(row.get('price_yen')),
-                        operating_hours=str(row['operating_hours']),
-                        contact=str(row['contact']),
-                        notes=str(row.get('notes', '')),
-                        capacity=str(row.get('capacity', '')),
-                        requirements=str(row.get('requirements', ''))
+                        transport_type=str(row.transport_type),
+                        service_name=str(row.service_name),
+                        location=str(row.location),
+                        price_yen=row.price_yen,
+                        operating_hours=str(row.operating_hours),
+                        contact=str(row.contact),
+                        notes=str(row.notes),
+                        capacity=str(row.capacity),
+                        requirements=str(row.requirements)
                     ))
             
-            # 读取总结信息
-            summary = ""
-            summary_file = island_path / "island_transport_summary.md"
-            if summary_file.exists():
-                with open(summary_file, 'r', encoding='utf-8') as f:
-                    summary = f.read()
-            
+            # 总结信息在首次请求详情时再读取
             return IslandTransport(
                 island_name=island_name,
                 island_name_en=island_name_en,
                 bicycle_rentals=bicycle_rentals,
                 bus_schedules=bus_schedules,
                 other_transports=other_transports,
-                summary=summary
+                summary=""
             )
             
         except Exception as e:
@@ -136,41 +245,57 @@ class IslandService:
                 summary=""
             )
     
-    def _parse_price(self, price_value) -> Optional[int]:
-        """解析价格值"""
-        if pd.isna(price_value) or price_value == '要確認' or price_value == '-':
-            return None
-        try:
-            # 移除非数字字符并转换为整数
-            price_str = str(price_value).replace('円', '').replace(',', '').replace('日元', '')
-            if price_str.isdigit():
-                return int(price_str)
-            return None
-        except:
-            return None
+    def _parse_price_column(self, df: pd.DataFrame, *columns: str) -> pd.Series:
+        """整列解析价格值，按顺序合并备选列，无法解析的值为None"""
+        present = [df[column] for column in columns if column in df.columns]
+        if not present:
+            return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+        raw = present[0]
+        for other in present[1:]:
+            raw = raw.combine_first(other)
+
+        # 移除非数字字符，只保留纯数字的值（'要確認'、'-'、缺失值均为None）
+        price_str = raw.astype(str).str.replace(r'円|,|日元', '', regex=True)
+        prices = pd.to_numeric(price_str.where(price_str.str.isdigit()), errors='coerce').astype('Int64')
+        return prices.astype(object).where(prices.notna(), None)
+    
+    def _ensure_summary(self, island_data: IslandTransport) -> IslandTransport:
+        """首次访问时读取岛屿交通总结文件"""
+        if island_data.island_name_en not in self._summary_loaded:
+            summary_file = self.data_dir / island_data.island_name_en / "island_transport_summary.md"
+            if summary_file.exists():
+                try:
+                    island_data.summary = summary_file.read_text(encoding='utf-8')
+                except Exception as e:
+                    logger.warning(f"Error reading summary for {island_data.island_name}: {e}")
+            self._summary_loaded.add(island_data.island_name_en)
+        return island_data
     
     def get_all_islands(self) -> List[IslandTransport]:
         """获取所有岛屿交通信息"""
-        return list(self.islands_data.values())
+        return [self._ensure_summary(island_data) for island_data in self.islands_data.values()]
     
     def get_island_by_name(self, island_name: str) -> Optional[IslandTransport]:
         """根据岛屿名称获取交通信息"""
-        # 支持中文名和英文名查询
-        for island_data in self.islands_data.values():
-            if island_data.island_name == island_name or island_data.island_name_en == island_name:
-                return island_data
-        return None
+        island_data = self._by_name.get(island_name)
+        if island_data is None:
+            return None
+        return self._ensure_summary(island_data)
     
     def get_islands_summary(self) -> List[IslandTransportSummary]:
         """获取所有岛屿交通信息摘要"""
+        return self._summaries
+
+    def _build_islands_summary(self) -> List[IslandTransportSummary]:
+        """构建所有岛屿交通信息摘要"""
         summaries = []
         for island_data in self.islands_data.values():
             # 计算最低自行车租金
-            min_price = None
-            if island_data.bicycle_rentals:
-                prices = [rental.price_1day_yen for rental in island_data.bicycle_rentals if rental.price_1day_yen]
-                if prices:
-                    min_price = min(prices)
+            min_price = min(
+                (rental.price_1day_yen for rental in island_data.bicycle_rentals if rental.price_1day_yen),
+                default=None
+            )
             
             # 获取交通类型
             transport_types = set()
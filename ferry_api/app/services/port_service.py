@@ -11,9 +11,18 @@ class PortService:
     
     def __init__(self):
         self.data_loader = data_loader
+        # 数据加载后只构建一次模型列表和名称索引
+        self._ports = self._build_ports()
+        self._by_name = {}
+        for port in self._ports:
+            self._by_name.setdefault(port.name, port)
     
     def get_all_ports(self) -> List[Port]:
         """获取所有港口"""
+        return list(self._ports)
+    
+    def _build_ports(self) -> List[Port]:
+        """构建所有港口模型列表"""
         try:
             df = self.data_loader.get_ports_data()
             
@@ -60,13 +69,7 @@ class PortService:
     
     def get_port_by_name(self, name: str) -> Optional[Port]:
         """根据名称获取港口"""
-        ports = self.get_all_ports()
-        
-        for port in ports:
-            if port.name == name:
-                return port
-        
-        return None
+        return self._by_name.get(name)
 
 # 全局服务实例
 port_service = PortService()
@@ -1,11 +1,22 @@
+import numpy as np
 import pandas as pd
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from ..models.route import FerryRoute, RouteSearchParams
-from ..core.data_loader import data_loader
+from ..core.data_loader import data_loader, parse_hhmm
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 热门路线，导入时构建一次，所有请求共享同一份数据，不可修改
+POPULAR_ROUTES: Tuple[Dict[str, str], ...] = (
+    {"departure": "高松", "arrival": "直島", "description": "高松到直島 - 艺术之岛"},
+    {"departure": "宇野", "arrival": "直島", "description": "宇野到直島 - 最便捷路线"},
+    {"departure": "高松", "arrival": "小豆島", "description": "高松到小豆島 - 橄榄之岛"},
+    {"departure": "宇野", "arrival": "豊島", "description": "宇野到豊島 - 美术馆之岛"},
+    {"departure": "直島", "arrival": "豊島", "description": "直島到豊島 - 艺术跳岛"},
+    {"departure": "豊島", "arrival": "犬島", "description": "豊島到犬島 - 精炼所美术馆"},
+)
+
 class RouteService:
     """航线服务"""
     
@@ -15,24 +26,24 @@ class RouteService:
     def search_routes(self, params: RouteSearchParams) -> Tuple[List[FerryRoute], int]:
         """搜索航线"""
         try:
-            df = self.data_loader.get_timetable_data()
+            # 只读查询，直接使用已加载的数据，避免每次请求复制整个DataFrame
+            df = self.data_loader.timetable_df
             
-            if df.empty:
+            if df is None or df.empty:
                 return [], 0
             
             # 应用搜索过滤器
-            filtered_df = self._apply_filters(df, params)
+            mask = self._apply_filters(df, params)
             
             # 计算总数
-            total = len(filtered_df)
+            row_positions = np.flatnonzero(mask)
+            total = int(row_positions.size)
             
-            # 应用分页
+            # 应用分页，直接取加载时预构建的航线对象
             start_idx = (params.page - 1) * params.limit
             end_idx = start_idx + params.limit
-            paginated_df = filtered_df.iloc[start_idx:end_idx]
-            
-            # 转换为模型
-            routes = self._dataframe_to_routes(paginated_df)
+            routes_all = self.data_loader.routes_all
+            routes = [routes_all[i] for i in row_positions[start_idx:end_idx]]
             
             return routes, total
             
@@ -40,94 +51,62 @@ class RouteService:
             logger.error(f"Error searching routes: {e}")
             return [], 0
     
-    def _apply_filters(self, df: pd.DataFrame, params: RouteSearchParams) -> pd.DataFrame:
-        """应用搜索过滤器"""
-        filtered_df = df.copy()
+    def _apply_filters(self, df: pd.DataFrame, params: RouteSearchParams) -> np.ndarray:
+        """应用搜索过滤器，返回组合后的布尔掩码"""
+        mask = np.ones(len(df), dtype=bool)
         
         # 出发地过滤
         if params.departure:
-            filtered_df = filtered_df[
-                filtered_df['出发地'].str.contains(params.departure, na=False, case=False)
-            ]
+            mask &= self._index_mask(self.data_loader.departure_index, params.departure, len(df))
         
         # 到达地过滤
         if params.arrival:
-            filtered_df = filtered_df[
-                filtered_df['到达地'].str.contains(params.arrival, na=False, case=False)
-            ]
+            mask &= self._index_mask(self.data_loader.arrival_index, params.arrival, len(df))
         
         # 公司过滤
         if params.company:
-            filtered_df = filtered_df[
-                filtered_df['运营公司'].str.contains(params.company, na=False, case=False)
-            ]
+            mask &= self._index_mask(self.data_loader.company_index, params.company, len(df))
         
-        # 时间范围过滤
+        # 时间范围过滤（优先使用预编码的HHMM整数数组，格式不符时按字符串比较）
         if params.departure_time_start:
-            filtered_df = filtered_df[
-                filtered_df['出发时间'] >= params.departure_time_start
-            ]
+            start = parse_hhmm(params.departure_time_start)
+            if start is not None:
+                mask &= self.data_loader.departure_hhmm >= start
+            else:
+                mask &= (df['出发时间'] >= params.departure_time_start).to_numpy()
         
         if params.departure_time_end:
-            filtered_df = filtered_df[
-                filtered_df['出发时间'] <= params.departure_time_end
-            ]
+            end = parse_hhmm(params.departure_time_end)
+            if end is not None:
+                mask &= self.data_loader.departure_hhmm <= end
+            else:
+                mask &= (df['出发时间'] <= params.departure_time_end).to_numpy()
         
-        # 车辆过滤
+        # 车辆过滤（使用加载时预编码的int8数组）
         if params.allows_vehicles is not None:
-            vehicle_filter = "是" if params.allows_vehicles else "否"
-            filtered_df = filtered_df[
-                filtered_df['允许车辆'] == vehicle_filter
-            ]
+            mask &= self.data_loader.vehicle_flags == int(params.allows_vehicles)
         
         # 自行车过滤
         if params.allows_bicycles is not None:
-            bicycle_filter = "是" if params.allows_bicycles else "否"
-            filtered_df = filtered_df[
-                filtered_df['允许自行车'] == bicycle_filter
-            ]
+            mask &= self.data_loader.bicycle_flags == int(params.allows_bicycles)
         
-        return filtered_df
+        return mask
     
-    def _dataframe_to_routes(self, df: pd.DataFrame) -> List[FerryRoute]:
-        """将DataFrame转换为FerryRoute列表"""
-        routes = []
+    def _index_mask(self, index: dict, term: str, size: int) -> np.ndarray:
+        """通过倒排索引计算子串匹配（不区分大小写）的行掩码"""
+        term = term.lower()
+        mask = np.zeros(size, dtype=bool)
         
-        for _, row in df.iterrows():
-            try:
-                route = FerryRoute(
-                    departure_port=str(row['出发地']),
-                    arrival_port=str(row['到达地']),
-                    departure_time=str(row['出发时间']),
-                    arrival_time=str(row['到达时间']),
-                    company=str(row['运营公司']),
-                    ship_type=str(row['船只类型']),
-                    allows_vehicles=row['允许车辆'] == "是",
-                    allows_bicycles=row['允许自行车'] == "是",
-                    adult_fare=str(row['大人票价']),
-                    child_fare=str(row['小人票价']),
-                    operating_days=str(row['运营日期']),
-                    notes=str(row['备注']) if pd.notna(row['备注']) else None
-                )
-                routes.append(route)
-            except Exception as e:
-                logger.warning(f"Error converting row to route: {e}")
-                continue
+        # 只在去重后的键上做子串匹配，再按行位置置位
+        for key, rows in index.items():
+            if term in key:
+                mask[rows] = True
         
-        return routes
+        return mask
     
-    def get_popular_routes(self) -> List[dict]:
-        """获取热门路线"""
-        popular_routes = [
-            {"departure": "高松", "arrival": "直島", "description": "高松到直島 - 艺术之岛"},
-            {"departure": "宇野", "arrival": "直島", "description": "宇野到直島 - 最便捷路线"},
-            {"departure": "高松", "arrival": "小豆島", "description": "高松到小豆島 - 橄榄之岛"},
-            {"departure": "宇野", "arrival": "豊島", "description": "宇野到豊島 - 美术馆之岛"},
-            {"departure": "直島", "arrival": "豊島", "description": "直島到豊島 - 艺术跳岛"},
-            {"departure": "豊島", "arrival": "犬島", "description": "豊島到犬島 - 精炼所美术馆"},
-        ]
-        
-        return popular_routes
+    def get_popular_routes(self) -> Tuple[Dict[str, str], ...]:
+        """获取热门路线（只读，调用方如需修改请先复制）"""
+        return POPULAR_ROUTES
 
 # 全局服务实例
 route_service = RouteService()
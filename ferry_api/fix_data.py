@@ -3,9 +3,9 @@
 修复数据文件格式
 """
 
-import pandas as pd
-import json
+import csv
 import logging
+from typing import Any, Dict, List
 
 # 配置日志
 logging.basicConfig(
@@ -14,6 +14,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def write_csv(path: str, rows: List[Dict[str, Any]]):
+    """将字典列表写入CSV，列为所有行中出现过的字段（按首次出现顺序），缺失值留空"""
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='', lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+
 def fix_ports_data():
     """修复港口数据"""
     try:
@@ -35,8 +43,7 @@ def fix_ports_data():
             {"name": "男木島港", "island": "男木島", "address": "香川県高松市", "features": "猫島港口", "connections": "高松、女木島"}
         ]
         
-        df = pd.DataFrame(ports_data)
-        df.to_csv('data/ports.csv', index=False, encoding='utf-8')
+        write_csv('data/ports.csv', ports_data)
         logger.info(f"修复港口数据完成，共 {len(ports_data)} 条")
         return True
         
@@ -59,8 +66,7 @@ def fix_companies_data():
             {"name": "雌雄島海運", "phone": "087-840-9055", "website": "https://www.shiwaku.jp/", "main_routes": "高松-女木島-男木島", "notes": "女木島、男木島专线"}
         ]
         
-        df = pd.DataFrame(companies_data)
-        df.to_csv('data/companies.csv', index=False, encoding='utf-8')
+        write_csv('data/companies.csv', companies_data)
         logger.info(f"修复公司数据完成，共 {len(companies_data)} 条")
         return True
         
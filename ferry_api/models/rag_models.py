@@ -1,7 +1,14 @@
+from enum import Enum
+from dataclasses import dataclass, field
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+class SystemMode(str, Enum):
+    """系统模式"""
+    MULTI_AGENT = "multi_agent"
+    LEGACY = "legacy"
+
 class ChatMessage(BaseModel):
     """聊天消息模型"""
     role: str  # "user" or "assistant"
@@ -14,10 +21,17 @@ class ChatQuery(BaseModel):
     session_id: Optional[str] = None
     context: Optional[List[ChatMessage]] = []
 
+@dataclass(slots=True)
+class Source:
+    """回复的来源信息"""
+    type: str
+    content: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
 class ChatResponse(BaseModel):
     """聊天响应"""
     message: str
-    sources: Optional[List[Dict[str, Any]]] = []
+    sources: Optional[List[Source]] = []
     session_id: str
     suggestions: Optional[List[str]] = []
     verification: Optional[Dict[str, Any]] = None
@@ -35,6 +49,8 @@ class TripPlanResponse(BaseModel):
     total_cost: Optional[str] = None
     total_duration: Optional[str] = None
     recommendations: Optional[List[str]] = []
+    relevant_routes: Optional[List[Dict[str, Any]]] = []  # 检索到的相关航线文档
+    raw_plan: Optional[str] = None  # Gemini未返回有效JSON时的原始规划文本
 
 class UserPreferences(BaseModel):
     """用户偏好"""
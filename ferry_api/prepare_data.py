@@ -4,8 +4,7 @@
 将现有数据文件转换为RAG系统需要的格式
 """
 
-import pandas as pd
-import json
+import orjson
 import os
 import logging
 from pathlib import Path
@@ -20,6 +19,9 @@ logger = logging.getLogger(__name__)
 def prepare_ferry_routes():
     """准备船班路线数据"""
     try:
+        # pandas只在需要处理CSV的步骤中导入，生成热门路线等步骤无需加载
+        import pandas as pd
+        
         # 读取现有的船班数据
         df = pd.read_csv('data/setouchi_ferry_timetable.csv')
         logger.info(f"读取到 {len(df)} 条船班数据")
@@ -76,6 +78,8 @@ def prepare_ferry_routes():
 def prepare_ports_data():
     """准备港口数据"""
     try:
+        import pandas as pd
+        
         # 读取现有的港口数据
         df = pd.read_csv('data/ports_info.csv')
         logger.info(f"读取到 {len(df)} 条港口数据")
@@ -121,6 +125,8 @@ def prepare_ports_data():
 def prepare_companies_data():
     """准备公司数据"""
     try:
+        import pandas as pd
+        
         # 读取现有的公司数据
         df = pd.read_csv('data/ferry_companies_info.csv')
         logger.info(f"读取到 {len(df)} 条公司数据")
@@ -201,8 +207,8 @@ def prepare_popular_routes():
         ]
         
         # 保存为JSON文件
-        with open('data/popular_routes.json', 'w', encoding='utf-8') as f:
-            json.dump(popular_routes, f, ensure_ascii=False, indent=2)
+        with open('data/popular_routes.json', 'wb') as f:
+            f.write(orjson.dumps(popular_routes, option=orjson.OPT_INDENT_2))
         
         logger.info(f"热门路线数据准备完成，共 {len(popular_routes)} 条")
         return True
@@ -3,21 +3,41 @@
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import time
+import asyncio
 import logging
 
+import numpy as np
+
 from services.rag_engine import rag_engine
-from models.rag_models import ChatMessage, ChatResponse
+from services.vector_store import vector_store
+from services.embedding_service import embedding_service
+from services.gemini_service import gemini_service
+from models.rag_models import ChatMessage, ChatResponse, SystemMode
+from routers.rag_router import stream_chat_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/multi-agent", tags=["Multi-Agent System"])
 
+# 健康检查结果的缓存时间（秒）
+HEALTH_CACHE_TTL_SECONDS = 5
+_health_cache: Dict[str, Any] = {"ts": 0.0, "data": None}
+
+def _make_probe_embedding() -> List[float]:
+    """生成固定的单位随机向量，用于探测向量存储而无需调用Embedding API"""
+    vector = np.random.default_rng(0).standard_normal(embedding_service.get_embedding_dimension())
+    return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+HEALTH_PROBE_EMBEDDING = _make_probe_embedding()
+
 @router.post("/chat", response_model=ChatResponse)
 async def multi_agent_chat(
     message: str,
     session_id: Optional[str] = None,
-    force_mode: Optional[str] = Query(None, description="强制使用指定模式: 'multi_agent' 或 'legacy'")
+    force_mode: Optional[SystemMode] = Query(None, description="强制使用指定模式: 'multi_agent' 或 'legacy'"),
+    stream: bool = Query(False, description="以SSE格式流式返回回复")
 ):
     """
     使用多层Agent系统进行聊天查询
@@ -26,29 +46,23 @@ async def multi_agent_chat(
         message: 用户消息
         session_id: 会话ID（可选）
         force_mode: 强制使用的模式（可选）
+        stream: 是否以SSE格式流式返回（可选）
     
     Returns:
         聊天响应，包含验证信息和Agent性能数据
     """
+    mode = force_mode.value if force_mode else None
+    if stream:
+        return stream_chat_response(message, session_id, mode=mode)
+
     try:
-        # 临时切换模式（如果指定）
-        original_mode = rag_engine.system_mode
-        if force_mode:
-            rag_engine.set_system_mode(force_mode)
-        
-        try:
-            # 处理查询
-            response = await rag_engine.chat_query(
-                message=message,
-                session_id=session_id
-            )
-            
-            return response
-            
-        finally:
-            # 恢复原始模式
-            if force_mode:
-                rag_engine.set_system_mode(original_mode)
+        # 处理查询（指定的模式只作用于本次请求，不修改全局模式）；
+        # 独立问题的响应缓存由rag_engine处理，命中时同样记录会话历史
+        return await rag_engine.chat_query(
+            message=message,
+            session_id=session_id,
+            mode=mode
+        )
         
     except Exception as e:
         logger.error(f"多层Agent聊天失败: {str(e)}")
@@ -72,8 +86,25 @@ async def get_system_performance():
         logger.error(f"获取性能指标失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取性能指标失败: {str(e)}")
 
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    获取聊天相关缓存统计
+    
+    Returns:
+        各缓存的条目数和命中率
+    """
+    return {
+        "status": "success",
+        "data": {
+            "response_cache": rag_engine.response_cache.get_stats(),
+            "retrieval_cache": rag_engine.retrieval_cache.get_stats(),
+            "search_cache": vector_store.get_query_cache_stats()
+        }
+    }
+
 @router.post("/mode")
-async def set_system_mode(mode: str):
+async def set_system_mode(mode: SystemMode):
     """
     设置系统模式
     
@@ -84,19 +115,14 @@ async def set_system_mode(mode: str):
         操作结果
     """
     try:
-        if mode not in ['multi_agent', 'legacy']:
-            raise HTTPException(status_code=400, detail="无效的模式，必须是 'multi_agent' 或 'legacy'")
-        
-        rag_engine.set_system_mode(mode)
+        rag_engine.set_system_mode(mode.value)
         
         return {
             "status": "success",
-            "message": f"系统模式已切换为: {mode}",
+            "message": f"系统模式已切换为: {mode.value}",
             "current_mode": rag_engine.system_mode
         }
         
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error(f"设置系统模式失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"设置模式失败: {str(e)}")
@@ -113,7 +139,7 @@ async def get_system_mode():
         return {
             "status": "success",
             "current_mode": rag_engine.system_mode,
-            "available_modes": ["multi_agent", "legacy"]
+            "available_modes": [mode.value for mode in SystemMode]
         }
     except Exception as e:
         logger.error(f"获取系统模式失败: {str(e)}")
@@ -135,49 +161,46 @@ async def test_multi_agent_system():
             "比较一下去小豆岛的不同路线"
         ]
         
+        # 两种模式的所有测试查询并发执行，模式作为参数传入，不切换全局模式
+        multi_agent_tasks = [rag_engine.chat_query(query, mode='multi_agent') for query in test_queries]
+        legacy_tasks = [rag_engine.chat_query(query, mode='legacy') for query in test_queries]
+        responses = await asyncio.gather(*multi_agent_tasks, *legacy_tasks, return_exceptions=True)
+        
         test_results = []
         
-        for query in test_queries:
+        for query, multi_agent_response, legacy_response in zip(
+            test_queries, responses[:len(test_queries)], responses[len(test_queries):]
+        ):
             logger.info(f"测试查询: {query}")
             
-            try:
-                # 测试多层Agent系统
-                rag_engine.set_system_mode('multi_agent')
-                multi_agent_response = await rag_engine.chat_query(query)
-                
-                # 测试传统系统
-                rag_engine.set_system_mode('legacy')
-                legacy_response = await rag_engine.chat_query(query)
-                
-                test_results.append({
-                    "query": query,
-                    "multi_agent": {
-                        "accuracy_rate": multi_agent_response.verification.get("accuracy_rate", 0.0),
-                        "response_length": len(multi_agent_response.message),
-                        "verified_facts": multi_agent_response.verification.get("verified_facts", 0),
-                        "agent_performance": multi_agent_response.verification.get("agent_performance", [])
-                    },
-                    "legacy": {
-                        "response_length": len(legacy_response.message),
-                        "verification": legacy_response.verification
-                    }
-                })
-                
-            except Exception as e:
+            error = next((r for r in (multi_agent_response, legacy_response) if isinstance(r, Exception)), None)
+            if error is not None:
                 test_results.append({
                     "query": query,
-                    "error": str(e)
+                    "error": str(error)
                 })
-        
-        # 恢复多层Agent模式
-        rag_engine.set_system_mode('multi_agent')
+                continue
+            
+            test_results.append({
+                "query": query,
+                "multi_agent": {
+                    "accuracy_rate": multi_agent_response.verification.get("accuracy_rate", 0.0),
+                    "response_length": len(multi_agent_response.message),
+                    "verified_facts": multi_agent_response.verification.get("verified_facts", 0),
+                    "agent_performance": multi_agent_response.verification.get("agent_performance", [])
+                },
+                "legacy": {
+                    "response_length": len(legacy_response.message),
+                    "verification": legacy_response.verification
+                }
+            })
         
         return {
             "status": "success",
             "test_results": test_results,
             "summary": {
                 "total_tests": len(test_queries),
-                "successful_tests": len([r for r in test_results if "error" not in r])
+                "successful_tests": sum(1 for r in test_results if "error" not in r)
             }
         }
         
@@ -185,14 +208,57 @@ async def test_multi_agent_system():
         logger.error(f"测试多层Agent系统失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"测试失败: {str(e)}")
 
+async def _check_multi_layer_system(health_status: Dict[str, Any]) -> bool:
+    """检查多层Agent系统，出错时返回True"""
+    try:
+        if hasattr(rag_engine, 'multi_layer_system'):
+            performance = rag_engine.multi_layer_system.get_performance_metrics()
+            health_status["components"]["multi_layer_system"] = "healthy"
+            health_status["multi_agent_metrics"] = performance
+        else:
+            health_status["components"]["multi_layer_system"] = "not_initialized"
+        return False
+    except Exception as e:
+        health_status["components"]["multi_layer_system"] = f"error: {str(e)}"
+        return True
+
+async def _check_vector_store(health_status: Dict[str, Any]) -> bool:
+    """检查向量存储，出错时返回True"""
+    try:
+        # 用固定向量做简单的搜索测试
+        test_results = await vector_store.search_by_embedding(HEALTH_PROBE_EMBEDDING, n_results=1)
+        health_status["components"]["vector_store"] = "healthy"
+        return False
+    except Exception as e:
+        health_status["components"]["vector_store"] = f"error: {str(e)}"
+        return True
+
+async def _check_gemini_service(health_status: Dict[str, Any]) -> bool:
+    """检查Gemini服务，出错时返回True"""
+    try:
+        if gemini_service.model:
+            health_status["components"]["gemini_service"] = "healthy"
+        else:
+            health_status["components"]["gemini_service"] = "not_initialized"
+        return False
+    except Exception as e:
+        health_status["components"]["gemini_service"] = f"error: {str(e)}"
+        return True
+
 @router.get("/health")
 async def health_check():
     """
     健康检查
     
+    检查结果缓存HEALTH_CACHE_TTL_SECONDS秒，频繁的探活请求不会重复触发向量检索
+    
     Returns:
         系统健康状态
     """
+    now = time.monotonic()
+    if _health_cache["data"] is not None and now - _health_cache["ts"] < HEALTH_CACHE_TTL_SECONDS:
+        return _health_cache["data"]
+
     try:
         # 检查各个组件
         health_status = {
@@ -205,40 +271,19 @@ async def health_check():
             }
         }
         
-        # 检查多层Agent系统
-        try:
-            if hasattr(rag_engine, 'multi_layer_system'):
-                performance = rag_engine.multi_layer_system.get_performance_metrics()
-                health_status["components"]["multi_layer_system"] = "healthy"
-                health_status["multi_agent_metrics"] = performance
-            else:
-                health_status["components"]["multi_layer_system"] = "not_initialized"
-        except Exception as e:
-            health_status["components"]["multi_layer_system"] = f"error: {str(e)}"
-        
-        # 检查向量存储
-        try:
-            # 简单的搜索测试
-            from services.vector_store import vector_store
-            test_results = await vector_store.search("测试", n_results=1)
-            health_status["components"]["vector_store"] = "healthy"
-        except Exception as e:
-            health_status["components"]["vector_store"] = f"error: {str(e)}"
-        
-        # 检查Gemini服务
-        try:
-            from services.gemini_service import gemini_service
-            if gemini_service.model:
-                health_status["components"]["gemini_service"] = "healthy"
-            else:
-                health_status["components"]["gemini_service"] = "not_initialized"
-        except Exception as e:
-            health_status["components"]["gemini_service"] = f"error: {str(e)}"
+        # 各组件相互独立，并发检查，返回值为各组件是否出错
+        error_count = sum(await asyncio.gather(
+            _check_multi_layer_system(health_status),
+            _check_vector_store(health_status),
+            _check_gemini_service(health_status)
+        ))
         
         # 判断总体状态
-        if any("error" in status for status in health_status["components"].values()):
+        if error_count:
             health_status["status"] = "degraded"
         
+        _health_cache["ts"] = now
+        _health_cache["data"] = health_status
         return health_status
         
     except Exception as e:
@@ -1,29 +1,76 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+import json
+import uuid
 import logging
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.rag_models import (
-    ChatQuery, ChatResponse, TripPlanRequest, TripPlanResponse,
+    ChatMessage, ChatQuery, ChatResponse, TripPlanRequest, TripPlanResponse,
     UserPreferences, RecommendationResponse
 )
 from services.rag_engine import rag_engine
 from services.data_processor import data_processor
 from services.vector_store import vector_store
+from services.embedding_service import embedding_service
+from services.gemini_service import gemini_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/rag", tags=["RAG"])
 
+def stream_chat_response(
+    message: str,
+    session_id: Optional[str] = None,
+    context_history: Optional[List[ChatMessage]] = None,
+    mode: Optional[str] = None
+) -> StreamingResponse:
+    """
+    以SSE格式逐块返回聊天回复，会话ID通过X-Session-ID响应头返回
+    
+    Args:
+        message: 用户消息
+        session_id: 会话ID（可选）
+        context_history: 上下文历史
+        mode: 本次请求使用的系统模式（可选）
+    """
+    session_id = session_id or uuid.uuid4().hex
+
+    async def event_stream():
+        try:
+            async for chunk in rag_engine.chat_query_stream(
+                message=message,
+                session_id=session_id,
+                context_history=context_history,
+                mode=mode
+            ):
+                yield f"data: {json.dumps({'text': chunk}, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            yield f"data: {json.dumps({'error': f'聊天查询失败: {str(e)}'}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "X-Session-ID": session_id,
+            # 禁止代理缓冲，保证首个片段立即送达客户端
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat_query(query: ChatQuery):
+async def chat_query(query: ChatQuery, stream: bool = Query(False, description="以SSE格式流式返回回复")):
     """
     智能聊天查询
     
-    处理用户的自然语言查询，返回智能回复
+    处理用户的自然语言查询，返回智能回复；stream=true时改为流式返回
     """
+    if stream:
+        return stream_chat_response(query.message, query.session_id, query.context)
+
     try:
         response = await rag_engine.chat_query(
             message=query.message,
@@ -36,6 +83,15 @@ async def chat_query(query: ChatQuery):
         logger.error(f"Chat query error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"聊天查询失败: {str(e)}")
 
+@router.post("/chat/stream")
+async def chat_query_stream(query: ChatQuery):
+    """
+    流式聊天查询
+    
+    以SSE格式逐块返回生成的回复，会话ID通过X-Session-ID响应头返回
+    """
+    return stream_chat_response(query.message, query.session_id, query.context)
+
 @router.post("/plan", response_model=TripPlanResponse)
 async def plan_trip(request: TripPlanRequest):
     """
@@ -107,9 +163,6 @@ async def get_rag_status():
         vector_stats = vector_store.get_collection_stats()
         
         # 检查各服务状态
-        from services.embedding_service import embedding_service
-        from services.gemini_service import gemini_service
-        
         status = {
             "vector_store": {
                 "status": "active",
@@ -146,7 +199,7 @@ async def reset_knowledge_base():
         # 删除现有集合
         vector_store.delete_collection()
         
-        # 重新初始化
+        # 重新初始化（删除集合时已通过变更回调清空检索和响应缓存）
         vector_store._initialize_client()
         
         return {
@@ -170,16 +223,11 @@ async def search_knowledge_base(
     直接搜索向量数据库中的内容
     """
     try:
-        # 构建过滤条件
-        filter_metadata = None
-        if doc_type:
-            filter_metadata = {"type": doc_type}
-        
-        # 执行搜索
+        # 执行搜索（指定类型时只检索该类型的集合）
         results = await vector_store.search(
             query=query,
             n_results=limit,
-            filter_metadata=filter_metadata
+            collection_type=doc_type
         )
         
         return {
@@ -3,6 +3,7 @@
 瀬户内海船班查询API启动脚本
 """
 
+import os
 import uvicorn
 import sys
 from pathlib import Path
@@ -12,10 +13,13 @@ app_dir = Path(__file__).parent / "app"
 sys.path.insert(0, str(app_dir))
 
 if __name__ == "__main__":
+    # DEV=1 时开启热重载；默认单进程，设置WORKERS时才启动多个工作进程（各进程各自加载数据和缓存）
+    dev_mode = os.getenv("DEV") == "1"
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=dev_mode,
+        workers=None if dev_mode else int(os.getenv("WORKERS", "1")),
         log_level="info"
     )
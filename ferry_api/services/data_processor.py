@@ -1,11 +1,70 @@
 import pandas as pd
-import json
+import sys
+import orjson
+import asyncio
+import itertools
 import logging
 from typing import List, Dict, Any, Tuple
 from services.vector_store import vector_store
 
 logger = logging.getLogger(__name__)
 
+# 每批写入向量数据库的文档数量
+STORE_BATCH_SIZE = 256
+
+# 低基数的字符串列，以category类型加载以减少内存
+ROUTE_CATEGORY_DTYPES = {
+    'departure_port': 'category',
+    'arrival_port': 'category',
+    'company': 'category',
+    'ship_type': 'category',
+    'operating_days': 'category'
+}
+
+# 在文档元数据中大量重复出现的列，加载后统一驻留字符串
+ROUTE_INTERN_COLUMNS = [
+    'departure_port', 'arrival_port', 'company', 'ship_type', 'operating_days',
+    'departure_time', 'arrival_time', 'allows_vehicles', 'allows_bicycles',
+    'adult_fare', 'child_fare'
+]
+
+def _intern_value(value):
+    """驻留字符串值，其他类型原样返回"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _intern_columns(df: pd.DataFrame, columns: List[str]):
+    """驻留指定列中的字符串，使重复值在各行、各列间共享同一对象"""
+    for column in columns:
+        if column not in df.columns:
+            continue
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].cat.rename_categories(
+                [_intern_value(c) for c in df[column].cat.categories]
+            )
+        else:
+            df[column] = df[column].map(_intern_value)
+
+# 系统介绍为静态内容，导入时构建一次
+SYSTEM_INFO = """瀬户内海船班查询系统提供以下服务：
+1. 船班时间查询：查询各岛屿间的船班时间表
+2. 票价信息：提供大人和小人的票价信息
+3. 载运服务：查询是否可以载运车辆和自行车
+4. 跳岛规划：帮助规划多岛屿的旅行路线
+5. 公司信息：提供各船运公司的联系方式和服务信息
+
+主要覆盖岛屿：
+- 艺术岛屿：直島（现代艺术）、豊島（豊島美术馆）、犬島（犬島精炼所美术馆）
+- 自然岛屿：小豆島（橄榄之岛）、女木島（鬼岛传说）、男木島（猫咪天堂）
+- 本州港口：高松、宇野、神戸、新岡山港
+
+主要船运公司：四国汽船、ジャンボフェリー、国際両備フェリー、四国フェリー、雌雄島海運、豊島フェリー、小豆島豊島フェリー"""
+
+GENERAL_INFO_DOCUMENTS = [SYSTEM_INFO]
+GENERAL_INFO_METADATAS = [{
+    'type': 'system_info',
+    'category': 'general'
+}]
+
 class DataProcessor:
     """数据预处理服务"""
     
@@ -14,25 +73,31 @@ class DataProcessor:
         self.ports_data = None
         self.companies_data = None
         self.popular_routes_data = None
+        self._popular_route_documents = ([], [])
     
     def load_data(self):
         """加载所有数据"""
         try:
             # 加载船班数据
-            self.routes_data = pd.read_csv('data/ferry_routes.csv')
+            self.routes_data = pd.read_csv('data/ferry_routes.csv', dtype=ROUTE_CATEGORY_DTYPES)
             logger.info(f"Loaded {len(self.routes_data)} ferry routes")
             
             # 加载港口数据
-            self.ports_data = pd.read_csv('data/ports.csv')
+            self.ports_data = pd.read_csv('data/ports.csv', dtype={'island': 'category'})
             logger.info(f"Loaded {len(self.ports_data)} ports")
             
             # 加载公司数据
             self.companies_data = pd.read_csv('data/companies.csv')
             logger.info(f"Loaded {len(self.companies_data)} companies")
             
+            _intern_columns(self.routes_data, ROUTE_INTERN_COLUMNS)
+            _intern_columns(self.ports_data, ['name', 'island'])
+            _intern_columns(self.companies_data, ['name'])
+            
             # 加载热门路线数据
-            with open('data/popular_routes.json', 'r', encoding='utf-8') as f:
-                self.popular_routes_data = json.load(f)
+            with open('data/popular_routes.json', 'rb') as f:
+                self.popular_routes_data = orjson.loads(f.read())
+            self._popular_route_documents = self._build_popular_route_documents()
             logger.info(f"Loaded {len(self.popular_routes_data)} popular routes")
             
         except Exception as e:
@@ -45,20 +110,23 @@ class DataProcessor:
         metadatas = []
         
         for _, route in self.routes_data.iterrows():
+            vehicles_str = '允许' if route['allows_vehicles'] else '不允许'
+            bicycles_str = '允许' if route['allows_bicycles'] else '不允许'
+            
             # 创建详细的文档描述
-            doc = f"""
-船班路线：{route['departure_port']} 到 {route['arrival_port']}
-出发时间：{route['departure_time']}
-到达时间：{route['arrival_time']}
-船运公司：{route['company']}
-船只类型：{route['ship_type']}
-大人票价：{route['adult_fare']}
-小人票价：{route['child_fare']}
-运营日期：{route['operating_days']}
-车辆载运：{'允许' if route['allows_vehicles'] else '不允许'}
-自行车载运：{'允许' if route['allows_bicycles'] else '不允许'}
-备注：{route.get('notes', '无')}
-            """.strip()
+            doc = "\n".join((
+                f"船班路线：{route['departure_port']} 到 {route['arrival_port']}",
+                f"出发时间：{route['departure_time']}",
+                f"到达时间：{route['arrival_time']}",
+                f"船运公司：{route['company']}",
+                f"船只类型：{route['ship_type']}",
+                f"大人票价：{route['adult_fare']}",
+                f"小人票价：{route['child_fare']}",
+                f"运营日期：{route['operating_days']}",
+                f"车辆载运：{vehicles_str}",
+                f"自行车载运：{bicycles_str}",
+                f"备注：{route.get('notes', '无')}"
+            ))
             
             metadata = {
                 'type': 'route',
@@ -84,13 +152,13 @@ class DataProcessor:
         metadatas = []
         
         for _, port in self.ports_data.iterrows():
-            doc = f"""
-港口名称：{port['name']}
-所属岛屿：{port['island']}
-地址：{port['address']}
-港口特色：{port['features']}
-连接岛屿：{port['connections']}
-            """.strip()
+            doc = "\n".join((
+                f"港口名称：{port['name']}",
+                f"所属岛屿：{port['island']}",
+                f"地址：{port['address']}",
+                f"港口特色：{port['features']}",
+                f"连接岛屿：{port['connections']}"
+            ))
             
             metadata = {
                 'type': 'port',
@@ -112,13 +180,13 @@ class DataProcessor:
         metadatas = []
         
         for _, company in self.companies_data.iterrows():
-            doc = f"""
-船运公司：{company['name']}
-联系电话：{company['phone']}
-官方网站：{company['website']}
-主要航线：{company['main_routes']}
-备注信息：{company['notes']}
-            """.strip()
+            doc = "\n".join((
+                f"船运公司：{company['name']}",
+                f"联系电话：{company['phone']}",
+                f"官方网站：{company['website']}",
+                f"主要航线：{company['main_routes']}",
+                f"备注信息：{company['notes']}"
+            ))
             
             metadata = {
                 'type': 'company',
@@ -135,15 +203,20 @@ class DataProcessor:
     
     def create_popular_route_documents(self) -> Tuple[List[str], List[Dict[str, Any]]]:
         """创建热门路线文档"""
+        documents, metadatas = self._popular_route_documents
+        return list(documents), [dict(metadata) for metadata in metadatas]
+    
+    def _build_popular_route_documents(self) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """构建热门路线文档，随热门路线数据加载一次"""
         documents = []
         metadatas = []
         
         for route in self.popular_routes_data:
-            doc = f"""
-热门跳岛路线：{route['departure']} 到 {route['arrival']}
-路线描述：{route['description']}
-推荐理由：这是一条受欢迎的跳岛路线，适合游客体验瀬户内海的魅力。
-            """.strip()
+            doc = "\n".join((
+                f"热门跳岛路线：{route['departure']} 到 {route['arrival']}",
+                f"路线描述：{route['description']}",
+                "推荐理由：这是一条受欢迎的跳岛路线，适合游客体验瀬户内海的魅力。"
+            ))
             
             metadata = {
                 'type': 'popular_route',
@@ -159,33 +232,7 @@ class DataProcessor:
     
     def create_general_info_documents(self) -> Tuple[List[str], List[Dict[str, Any]]]:
         """创建通用信息文档"""
-        documents = []
-        metadatas = []
-        
-        # 添加系统介绍
-        system_info = """
-瀬户内海船班查询系统提供以下服务：
-1. 船班时间查询：查询各岛屿间的船班时间表
-2. 票价信息：提供大人和小人的票价信息
-3. 载运服务：查询是否可以载运车辆和自行车
-4. 跳岛规划：帮助规划多岛屿的旅行路线
-5. 公司信息：提供各船运公司的联系方式和服务信息
-
-主要覆盖岛屿：
-- 艺术岛屿：直島（现代艺术）、豊島（豊島美术馆）、犬島（犬島精炼所美术馆）
-- 自然岛屿：小豆島（橄榄之岛）、女木島（鬼岛传说）、男木島（猫咪天堂）
-- 本州港口：高松、宇野、神戸、新岡山港
-
-主要船运公司：四国汽船、ジャンボフェリー、国際両備フェリー、四国フェリー、雌雄島海運、豊島フェリー、小豆島豊島フェリー
-        """.strip()
-        
-        documents.append(system_info)
-        metadatas.append({
-            'type': 'system_info',
-            'category': 'general'
-        })
-        
-        return documents, metadatas
+        return list(GENERAL_INFO_DOCUMENTS), [dict(metadata) for metadata in GENERAL_INFO_METADATAS]
     
     async def process_and_store_all_data(self):
         """处理并存储所有数据到向量数据库"""
@@ -193,32 +240,25 @@ class DataProcessor:
             # 加载数据
             self.load_data()
             
-            all_documents = []
-            all_metadatas = []
-            
-            # 处理各类数据
-            route_docs, route_metas = self.create_route_documents()
-            all_documents.extend(route_docs)
-            all_metadatas.extend(route_metas)
-            
-            port_docs, port_metas = self.create_port_documents()
-            all_documents.extend(port_docs)
-            all_metadatas.extend(port_metas)
-            
-            company_docs, company_metas = self.create_company_documents()
-            all_documents.extend(company_docs)
-            all_metadatas.extend(company_metas)
-            
-            popular_docs, popular_metas = self.create_popular_route_documents()
-            all_documents.extend(popular_docs)
-            all_metadatas.extend(popular_metas)
-            
-            general_docs, general_metas = self.create_general_info_documents()
-            all_documents.extend(general_docs)
-            all_metadatas.extend(general_metas)
+            # 各类文档的构建互不依赖，在线程中并行处理
+            docs_metas = await asyncio.gather(
+                asyncio.to_thread(self.create_route_documents),
+                asyncio.to_thread(self.create_port_documents),
+                asyncio.to_thread(self.create_company_documents),
+                asyncio.to_thread(self.create_popular_route_documents),
+                asyncio.to_thread(self.create_general_info_documents)
+            )
+            all_documents = list(itertools.chain.from_iterable(docs for docs, _ in docs_metas))
+            all_metadatas = list(itertools.chain.from_iterable(metas for _, metas in docs_metas))
             
-            # 存储到向量数据库
-            await vector_store.add_documents(all_documents, all_metadatas)
+            # 分批并行存储到向量数据库
+            await asyncio.gather(*[
+                vector_store.add_documents(
+                    all_documents[i:i + STORE_BATCH_SIZE],
+                    all_metadatas[i:i + STORE_BATCH_SIZE]
+                )
+                for i in range(0, len(all_documents), STORE_BATCH_SIZE)
+            ])
             
             logger.info(f"Successfully processed and stored {len(all_documents)} documents")
             
@@ -0,0 +1,86 @@
+"""
+向量磁盘缓存 - 以SQLite持久化文本向量，进程重启后仍可命中
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingDiskCache:
+    """以(文本SHA-256摘要, 模型名)为键的SQLite向量缓存，向量按float32存储；超出上限时淘汰最早写入的条目"""
+
+    def __init__(self, path: str, max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 读写在线程池中执行，同一连接的访问需串行
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash BLOB NOT NULL, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[bytes], model: str) -> Dict[bytes, List[float]]:
+        """
+        批量读取向量
+
+        Args:
+            keys: 文本的SHA-256摘要列表
+            model: 模型名
+
+        Returns:
+            摘要 -> 向量，只包含命中的条目
+        """
+        found: Dict[bytes, List[float]] = {}
+        with self._lock:
+            # SQLite单条语句的参数个数有限，分段查询
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                for key, vec in rows:
+                    found[key] = np.frombuffer(vec, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: Iterable[Tuple[bytes, List[float]]], model: str):
+        """
+        在一个事务中批量写入向量
+
+        Args:
+            items: (摘要, 向量) 序列
+            model: 模型名
+        """
+        rows = []
+        for key, embedding in items:
+            vector = np.asarray(embedding, dtype=np.float32)
+            rows.append((key, model, vector.shape[0], vector.tobytes()))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            
+            # 重新写入的条目获得新的rowid，按rowid淘汰即淘汰最早写入的条目
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                    (count - self.max_entries,)
+                )
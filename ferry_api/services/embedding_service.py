@@ -1,12 +1,23 @@
 import os
 import asyncio
-from typing import List, Dict, Any
+import hashlib
 import logging
-from dashscope import TextEmbedding
-import dashscope
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
+import httpx
+import numpy as np
+from services.embedding_disk_cache import EmbeddingDiskCache
 
 logger = logging.getLogger(__name__)
 
+DASHSCOPE_EMBEDDING_URL = "https://dashscope.aliyuncs.com/api/v1/services/embeddings/text-embedding/text-embedding"
+
+# 共享的HTTP连接池，保持长连接以复用TCP/TLS握手
+_http = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    timeout=30
+)
+
 class EmbeddingService:
     """通义千问 Embedding 3.0 服务"""
     
@@ -15,11 +26,31 @@ class EmbeddingService:
         self.api_key = os.getenv("QWEN_API_KEY")
         if not self.api_key:
             logger.warning("QWEN_API_KEY not found in environment variables")
-        else:
-            dashscope.api_key = self.api_key
         
         self.model_name = "text-embedding-v3"
         self.max_batch_size = 10  # 通义千问API的批处理限制
+        self.max_concurrent_requests = 8  # 大批量向量化时同时进行的API请求数
+        
+        # 文本向量缓存：SHA-256摘要 -> 向量，按LRU淘汰
+        self.max_cache_size = 4096
+        self._cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        # 内存未命中时再查磁盘缓存，进程重启后相同文本不必重新调用API；
+        # 设置EMBEDDING_CACHE_PATH后才启用
+        self._disk_cache: Optional[EmbeddingDiskCache] = None
+        cache_path = os.getenv("EMBEDDING_CACHE_PATH")
+        if cache_path:
+            try:
+                self._disk_cache = EmbeddingDiskCache(cache_path)
+            except Exception as e:
+                logger.warning(f"Embedding disk cache unavailable: {str(e)}")
+        
+        # 单条向量请求的微批处理：时间窗口内的并发请求合并为一次API调用
+        self.batch_window = 0.05  # 秒
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_worker: Optional[asyncio.Task] = None
+        # 事件循环只弱引用任务，进行中的批处理任务需在此保留强引用，避免被回收
+        self._batch_tasks: Set[asyncio.Task] = set()
     
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -29,54 +60,160 @@ class EmbeddingService:
             texts: 要向量化的文本列表
             
         Returns:
-            向量列表
+            向量列表，均已归一化为单位向量
         """
+        keys = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        
+        # 已缓存的文本直接取用，只为未缓存的文本（去重后）调用API
+        found: Dict[bytes, List[float]] = {}
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                found[key] = embedding
+            else:
+                missing[key] = text
+        
+        if missing and self._disk_cache is not None:
+            stored = await asyncio.to_thread(self._disk_cache.get_many, list(missing), self.model_name)
+            for key, embedding in stored.items():
+                found[key] = embedding
+                self._cache[key] = embedding
+                del missing[key]
+        
+        if missing:
+            embeddings = self._normalize(await self._request_embeddings(list(missing.values())))
+            for key, embedding in zip(missing, embeddings):
+                found[key] = embedding
+                self._cache[key] = embedding
+            
+            if self._disk_cache is not None:
+                await asyncio.to_thread(self._disk_cache.put_many, list(zip(missing, embeddings)), self.model_name)
+        
+        while len(self._cache) > self.max_cache_size:
+            self._cache.popitem(last=False)
+        
+        return [found[key] for key in keys]
+    
+    @staticmethod
+    def _normalize(embeddings: List[List[float]]) -> List[List[float]]:
+        """归一化为单位向量，下游的余弦相似度可直接用点积计算"""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        return matrix.tolist()
+    
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """调用通义千问API获取向量"""
         if not self.api_key:
             logger.error("QWEN_API_KEY not configured")
             raise ValueError("QWEN_API_KEY not configured")
         
+        # 按长度排序后分批，同一批内文本长度相近；各批在并发上限内同时请求
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        chunks = [order[i:i + self.max_batch_size] for i in range(0, len(order), self.max_batch_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        
+        async def request_chunk(chunk: List[int]) -> List[List[float]]:
+            async with semaphore:
+                return await self._request_batch([texts[i] for i in chunk])
+        
         try:
-            # 分批处理大量文本
-            all_embeddings = []
-            
-            for i in range(0, len(texts), self.max_batch_size):
-                batch = texts[i:i + self.max_batch_size]
-                
-                # 调用通义千问API
-                response = await asyncio.to_thread(
-                    TextEmbedding.call,
-                    model=self.model_name,
-                    input=batch,
-                    dimension=1024  # 指定向量维度
-                )
-                
-                if response.status_code == 200:
-                    embeddings = response.output['embeddings']
-                    # 提取embedding向量
-                    batch_embeddings = [item['embedding'] for item in embeddings]
-                    all_embeddings.extend(batch_embeddings)
-                else:
-                    logger.error(f"Embedding API error: {response.message}")
-                    raise Exception(f"Embedding API error: {response.message}")
-            
-            return all_embeddings
-            
+            batch_results = await asyncio.gather(*(request_chunk(chunk) for chunk in chunks))
         except Exception as e:
             logger.error(f"Error getting embeddings: {str(e)}")
             raise
+        
+        # 按原始顺序回填
+        all_embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        for chunk, batch_embeddings in zip(chunks, batch_results):
+            for i, embedding in zip(chunk, batch_embeddings):
+                all_embeddings[i] = embedding
+        
+        return all_embeddings
+    
+    async def _request_batch(self, batch: List[str]) -> List[List[float]]:
+        """调用一次通义千问API，batch不超过max_batch_size条"""
+        response = await _http.post(
+            DASHSCOPE_EMBEDDING_URL,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": self.model_name,
+                "input": {"texts": batch},
+                "parameters": {"dimension": 1024}  # 指定向量维度
+            }
+        )
+        
+        if response.status_code != 200:
+            logger.error(f"Embedding API error: {response.text}")
+            raise Exception(f"Embedding API error: {response.text}")
+        
+        embeddings = sorted(response.json()['output']['embeddings'], key=lambda item: item['text_index'])
+        # 提取embedding向量
+        return [item['embedding'] for item in embeddings]
     
     async def get_single_embedding(self, text: str) -> List[float]:
         """
         获取单个文本的向量表示
         
+        未缓存的文本进入微批队列，与同一时间窗口内的其他请求合并调用API
+        
         Args:
             text: 要向量化的文本
             
         Returns:
-            向量
+            单位向量
         """
-        embeddings = await self.get_embeddings([text])
-        return embeddings[0] if embeddings else []
+        embedding = self._cache.get(hashlib.sha256(text.encode("utf-8")).digest())
+        if embedding is not None:
+            return embedding
+        
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop:
+            # 队列和后台任务绑定在当前事件循环上
+            self._batch_queue = asyncio.Queue()
+            self._batch_loop = loop
+            self._batch_worker = loop.create_task(self._run_batch_worker(self._batch_queue))
+        
+        future = loop.create_future()
+        await self._batch_queue.put((text, future))
+        return await future
+    
+    async def _run_batch_worker(self, queue: asyncio.Queue):
+        """收集时间窗口内的单条请求（最多max_batch_size条），合并后并发处理"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.batch_window
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            task = loop.create_task(self._fulfill_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _fulfill_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """为一批请求调用一次API并回填结果"""
+        try:
+            embeddings = await self.get_embeddings([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
     
     def get_embedding_dimension(self) -> int:
         """获取向量维度"""
@@ -1,12 +1,62 @@
 import os
+import json
+import time
 import asyncio
-from typing import List, Dict, Any, Optional
+import datetime
+from itertools import islice
+from typing import List, Dict, Any, Optional, AsyncIterator, Sequence
 import logging
 import google.generativeai as genai
 from models.rag_models import ChatMessage
 
 logger = logging.getLogger(__name__)
 
+# 系统提示词缓存（Gemini CachedContent）的有效期，提前刷新的余量
+PROMPT_CACHE_TTL_SECONDS = 3600
+PROMPT_CACHE_REFRESH_MARGIN_SECONDS = 60
+# Gemini 2.5 Flash 显式缓存的最小token数，系统提示词低于此长度时不创建缓存
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# 提示词中保留的最近对话消息数
+PROMPT_HISTORY_MESSAGES = 5
+
+# 系统提示词（静态部分），模块加载时构建一次
+SYSTEM_PROMPT = """你是瀬户内海跳岛查询系统的专业助手。你的核心任务是帮助用户查询岛屿间的船班信息和跳岛连接。
+
+你的专业能力：
+1. 精确查询船班时间、票价、运营公司
+2. 分析岛屿间的最佳跳岛路线和连接方式
+3. 提供载运车辆、自行车的船班信息
+4. 解答换乘、中转的具体操作方法
+5. 推荐高效的跳岛顺序和时间安排
+
+严格回答原则：
+- 专注于跳岛查询，不做详细行程规划
+- 只能基于提供的检索数据回答，绝对不能编造信息
+- 如果检索到的数据中没有相关信息，必须明确说"查询不到相关信息"或"数据库中没有此信息"
+- 严禁推测、估算或编造船班时间、票价、公司名称
+- 严禁基于常识或经验补充未在数据中找到的具体信息
+- 如果数据不完整，必须诚实告知并建议用户查询官方网站
+- 对于具体的时间、价格、公司信息，只能引用检索到的准确数据
+- 明确说明换乘点和等待时间（仅基于检索数据）
+- 如果查询信息不足，引导用户提供具体需求
+
+关键约束：
+- 如果用户询问的路线、时间、公司在检索数据中不存在，必须回复"查询不到相关信息"
+- 不得提供任何未在检索数据中明确出现的具体船班信息
+- 不得基于相似信息进行推理或建议
+
+重要提醒：宁可说"查询不到"也不要编造任何具体的船班时间、票价或公司信息。
+
+当前可用的岛屿包括：
+- 本州港口：高松、宇野、神戸、新岡山港
+- 艺术岛屿：直島、豊島、犬島
+- 其他岛屿：小豆島、女木島、男木島
+
+主要船运公司：
+- 四国汽船、ジャンボフェリー、国際両備フェリー、四国フェリー、雌雄島海運、豊島フェリー、小豆島豊島フェリー
+"""
+
 class GeminiService:
     """Gemini 2.5 Flash 服务"""
     
@@ -20,6 +70,16 @@ class GeminiService:
         
         self.model_name = "gemini-2.5-flash-preview-05-20"
         self.model = None
+        # 引用服务端缓存的系统提示词的模型，不可用时为None（退回发送完整提示词）；
+        # 缓存在首次请求时才创建，导入模块不会发起API调用
+        self._cached_content = None
+        self._cached_model = None
+        self._cached_model_expires_at = 0.0
+        self._prompt_cache_enabled = False
+        self._prompt_cache_lock = asyncio.Lock()
+        # 生成参数在初始化时构建一次，各请求复用
+        self._generation_config = None
+        self._json_config = None
         self._initialize_model()
     
     def _initialize_model(self):
@@ -27,15 +87,92 @@ class GeminiService:
         if self.api_key:
             try:
                 self.model = genai.GenerativeModel(self.model_name)
+                self._generation_config = genai.GenerationConfig(temperature=0.3, top_p=0.9)
+                # 行程规划要求模型直接输出JSON
+                self._json_config = genai.GenerationConfig(
+                    temperature=0.3,
+                    top_p=0.9,
+                    response_mime_type="application/json"
+                )
                 logger.info(f"Gemini model {self.model_name} initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Gemini model: {str(e)}")
+                return
+            
+            self._prompt_cache_enabled = True
+    
+    def _create_prompt_cache(self):
+        """
+        将系统提示词注册为Gemini缓存内容，之后的请求只需发送上下文和问题
+        
+        创建新缓存后删除上一次创建的缓存；提示词低于最小可缓存长度或创建失败时
+        停用提示词缓存，继续发送完整提示词
+        """
+        try:
+            if self._cached_content is None:
+                token_count = self.model.count_tokens(SYSTEM_PROMPT).total_tokens
+                if token_count < PROMPT_CACHE_MIN_TOKENS:
+                    self._prompt_cache_enabled = False
+                    logger.info(
+                        f"System prompt has {token_count} tokens, below the minimum of "
+                        f"{PROMPT_CACHE_MIN_TOKENS} for caching; sending full prompt"
+                    )
+                    return
+            
+            cached_content = genai.caching.CachedContent.create(
+                model=f"models/{self.model_name}",
+                system_instruction=SYSTEM_PROMPT,
+                ttl=datetime.timedelta(seconds=PROMPT_CACHE_TTL_SECONDS)
+            )
+        except Exception as e:
+            # SDK版本不支持等情况下，继续发送完整提示词
+            self._prompt_cache_enabled = False
+            self._cached_model = None
+            logger.warning(f"System prompt caching unavailable, sending full prompt: {str(e)}")
+            return
+        
+        previous, self._cached_content = self._cached_content, cached_content
+        self._cached_model = genai.GenerativeModel.from_cached_content(cached_content=cached_content)
+        self._cached_model_expires_at = (
+            time.monotonic() + PROMPT_CACHE_TTL_SECONDS - PROMPT_CACHE_REFRESH_MARGIN_SECONDS
+        )
+        logger.info(f"System prompt cached as {cached_content.name}")
+        
+        if previous is not None:
+            try:
+                previous.delete()
+            except Exception as e:
+                # 旧缓存到期后也会被服务端删除
+                logger.warning(f"Failed to delete previous prompt cache {previous.name}: {str(e)}")
+    
+    async def _ensure_prompt_cache(self):
+        """首次请求时创建系统提示词缓存，临近过期时刷新；并发请求只触发一次创建"""
+        if not self._prompt_cache_enabled or time.monotonic() < self._cached_model_expires_at:
+            return
+        
+        async with self._prompt_cache_lock:
+            if self._prompt_cache_enabled and time.monotonic() >= self._cached_model_expires_at:
+                await asyncio.to_thread(self._create_prompt_cache)
+    
+    async def _prepare_request(
+        self, 
+        prompt: str, 
+        context: Optional[str] = None,
+        chat_history: Optional[Sequence[ChatMessage]] = None
+    ):
+        """选择请求使用的模型及提示词，系统提示词已缓存时不再重复发送"""
+        await self._ensure_prompt_cache()
+        
+        if self._cached_model is not None:
+            return self._cached_model, self._build_prompt(prompt, context, chat_history, include_system_prompt=False)
+        
+        return self.model, self._build_prompt(prompt, context, chat_history)
     
     async def generate_response(
         self, 
         prompt: str, 
         context: Optional[str] = None,
-        chat_history: Optional[List[ChatMessage]] = None
+        chat_history: Optional[Sequence[ChatMessage]] = None
     ) -> str:
         """
         生成回复
@@ -52,13 +189,13 @@ class GeminiService:
             raise ValueError("Gemini model not initialized")
         
         try:
-            # 构建完整的提示词
-            full_prompt = self._build_prompt(prompt, context, chat_history)
+            # 构建提示词
+            model, full_prompt = await self._prepare_request(prompt, context, chat_history)
             
             # 异步调用Gemini API
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                full_prompt
+            response = await model.generate_content_async(
+                full_prompt,
+                generation_config=self._generation_config
             )
             
             return response.text
@@ -67,68 +204,69 @@ class GeminiService:
             logger.error(f"Error generating response: {str(e)}")
             raise
     
+    async def generate_response_stream(
+        self, 
+        prompt: str, 
+        context: Optional[str] = None,
+        chat_history: Optional[Sequence[ChatMessage]] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式生成回复
+        
+        Args:
+            prompt: 用户输入
+            context: 检索到的相关信息
+            chat_history: 聊天历史
+            
+        Yields:
+            生成的文本片段
+        """
+        if not self.model:
+            raise ValueError("Gemini model not initialized")
+        
+        try:
+            model, full_prompt = await self._prepare_request(prompt, context, chat_history)
+            
+            response = await model.generate_content_async(
+                full_prompt,
+                generation_config=self._generation_config,
+                stream=True
+            )
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+            
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            raise
+    
     def _build_prompt(
         self, 
         user_query: str, 
         context: Optional[str] = None,
-        chat_history: Optional[List[ChatMessage]] = None
+        chat_history: Optional[Sequence[ChatMessage]] = None,
+        include_system_prompt: bool = True
     ) -> str:
-        """构建完整的提示词"""
+        """构建完整的提示词，系统提示词已在服务端缓存时可省略"""
         
-        system_prompt = """你是瀬户内海跳岛查询系统的专业助手。你的核心任务是帮助用户查询岛屿间的船班信息和跳岛连接。
-
-你的专业能力：
-1. 精确查询船班时间、票价、运营公司
-2. 分析岛屿间的最佳跳岛路线和连接方式
-3. 提供载运车辆、自行车的船班信息
-4. 解答换乘、中转的具体操作方法
-5. 推荐高效的跳岛顺序和时间安排
-
-严格回答原则：
-- 专注于跳岛查询，不做详细行程规划
-- 只能基于提供的检索数据回答，绝对不能编造信息
-- 如果检索到的数据中没有相关信息，必须明确说"查询不到相关信息"或"数据库中没有此信息"
-- 严禁推测、估算或编造船班时间、票价、公司名称
-- 严禁基于常识或经验补充未在数据中找到的具体信息
-- 如果数据不完整，必须诚实告知并建议用户查询官方网站
-- 对于具体的时间、价格、公司信息，只能引用检索到的准确数据
-- 明确说明换乘点和等待时间（仅基于检索数据）
-- 如果查询信息不足，引导用户提供具体需求
-
-关键约束：
-- 如果用户询问的路线、时间、公司在检索数据中不存在，必须回复"查询不到相关信息"
-- 不得提供任何未在检索数据中明确出现的具体船班信息
-- 不得基于相似信息进行推理或建议
-
-重要提醒：宁可说"查询不到"也不要编造任何具体的船班时间、票价或公司信息。
-
-当前可用的岛屿包括：
-- 本州港口：高松、宇野、神戸、新岡山港
-- 艺术岛屿：直島、豊島、犬島
-- 其他岛屿：小豆島、女木島、男木島
-
-主要船运公司：
-- 四国汽船、ジャンボフェリー、国際両備フェリー、四国フェリー、雌雄島海運、豊島フェリー、小豆島豊島フェリー
-"""
+        parts = [SYSTEM_PROMPT] if include_system_prompt else []
         
         # 添加上下文信息
         if context:
-            system_prompt += f"\n\n相关船班信息：\n{context}"
+            parts.append(f"\n\n相关船班信息：\n{context}")
         
-        # 添加聊天历史
-        conversation = ""
+        # 添加聊天历史（只保留最近几条消息，直接迭代会话的deque，不复制切片）
         if chat_history:
-            for msg in chat_history[-5:]:  # 只保留最近5条消息
-                role = "用户" if msg.role == "user" else "助手"
-                conversation += f"{role}: {msg.content}\n"
-        
-        if conversation:
-            system_prompt += f"\n\n对话历史：\n{conversation}"
+            parts.append("\n\n对话历史：\n")
+            parts.extend(
+                f"{'用户' if msg.role == 'user' else '助手'}: {msg.content}\n"
+                for msg in islice(chat_history, max(len(chat_history) - PROMPT_HISTORY_MESSAGES, 0), None)
+            )
         
         # 构建最终提示词
-        full_prompt = f"{system_prompt}\n\n用户问题: {user_query}\n\n请提供有帮助的回答："
+        parts.append(f"\n\n用户问题: {user_query}\n\n请提供有帮助的回答：")
         
-        return full_prompt
+        return "".join(parts).lstrip("\n")
     
     async def generate_trip_plan(
         self, 
@@ -170,13 +308,16 @@ class GeminiService:
 - recommendations: 建议列表
 """
             
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=self._json_config
             )
             
-            # 这里可以添加JSON解析逻辑
-            return {"raw_response": response.text}
+            try:
+                return json.loads(response.text)
+            except json.JSONDecodeError:
+                logger.warning("Trip plan response is not valid JSON, returning raw text")
+                return {"raw_response": response.text}
             
         except Exception as e:
             logger.error(f"Error generating trip plan: {str(e)}")
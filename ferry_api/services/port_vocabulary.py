@@ -0,0 +1,89 @@
+"""
+港口词表 - 将查询中出现的地名映射为航线数据中的港口名
+"""
+
+import csv
+import logging
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PORTS_DATA_PATH = "data/ports.csv"
+ROUTES_DATA_PATH = "data/ferry_routes.csv"
+
+# 地名中简体字与日文写法不同的字（直岛 -> 直島，丰岛 -> 豊島，神户 -> 神戸）
+SIMPLIFIED_PLACE_CHARS = str.maketrans("岛丰户冈宫柜", "島豊戸岡宮櫃")
+
+def normalize_place_text(text: str) -> str:
+    """将文本中地名的简体写法转换为航线数据中的日文写法"""
+    return text.translate(SIMPLIFIED_PLACE_CHARS)
+
+def load_route_ports(routes_path: str = ROUTES_DATA_PATH) -> Set[str]:
+    """读取航线数据中出现过的全部港口名（出发港和到达港）"""
+    with open(routes_path, encoding="utf-8") as f:
+        return {
+            port
+            for row in csv.DictReader(f)
+            for port in (row["departure_port"], row["arrival_port"])
+            if port
+        }
+
+def match_route_port(name: str, route_ports: Set[str]) -> Optional[str]:
+    """
+    找出港口信息表中的港口名在航线数据中的写法
+
+    航线数据中有的港口带“港”（新岡山港），有的不带（高松），两种写法都尝试
+
+    Returns:
+        航线数据中的港口名，找不到时返回None
+    """
+    for candidate in (name, name.removesuffix("港")):
+        if candidate in route_ports:
+            return candidate
+    return None
+
+def build_port_terms(
+    port_rows: Iterable[Mapping[str, str]],
+    route_ports: Set[str]
+) -> Dict[str, Tuple[str, ...]]:
+    """
+    构建地名 -> 航线港口名的映射
+
+    港口名本身、去掉“港”后的港口名和所属岛屿名（本州除外）都可作为地名
+
+    Args:
+        port_rows: 港口信息（含name、island列）
+        route_ports: 航线数据中的港口名
+
+    Returns:
+        地名 -> 航线港口名元组
+    """
+    terms: Dict[str, List[str]] = {}
+
+    def add(term: str, port: str):
+        ports = terms.setdefault(term, [])
+        if port not in ports:
+            ports.append(port)
+
+    for port in sorted(route_ports):
+        add(port, port)
+        add(port.removesuffix("港"), port)
+
+    for row in port_rows:
+        port = match_route_port(row["name"], route_ports)
+        if port is None:
+            logger.warning(f"Port {row['name']} does not appear in route data")
+            continue
+        if row["island"] and row["island"] != "本州":
+            add(row["island"], port)
+
+    return {term: tuple(ports) for term, ports in terms.items()}
+
+def load_port_terms(
+    ports_path: str = PORTS_DATA_PATH,
+    routes_path: str = ROUTES_DATA_PATH
+) -> Dict[str, Tuple[str, ...]]:
+    """从港口信息表和航线数据构建地名映射"""
+    route_ports = load_route_ports(routes_path)
+    with open(ports_path, encoding="utf-8") as f:
+        return build_port_terms(csv.DictReader(f), route_ports)
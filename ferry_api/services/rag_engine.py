@@ -1,21 +1,157 @@
+import re
+import time
+import unicodedata
 import uuid
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, deque
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 from services.vector_store import vector_store
+from services.embedding_service import embedding_service
+from services.semantic_cache import SemanticCache
 from services.gemini_service import gemini_service
 from services.response_verifier import response_verifier
 from services.data_processor import data_processor
-from models.rag_models import ChatMessage, ChatResponse, TripPlanResponse
+from models.rag_models import ChatMessage, ChatResponse, Source, TripPlanResponse, SystemMode
 from agents.multi_layer_agent_system import MultiLayerAgentSystem
 
 logger = logging.getLogger(__name__)
 
+# 可用的系统模式
+SYSTEM_MODES = tuple(mode.value for mode in SystemMode)
+
+# 每个会话保留的最大消息数
+MAX_SESSION_HISTORY = 20
+
+# 行程规划时最多保留的相关路线数
+MAX_TRIP_ROUTES = 15
+
+# Gemini未给出时使用的行程建议
+DEFAULT_TRIP_RECOMMENDATIONS = ["建议提前预订", "注意船班时间", "准备好相关证件"]
+
+# 聊天回复中最多返回的来源数
+MAX_SOURCES = 3
+
+# 提示词上下文中每篇文档的最大字符数，以及上下文累计字符数上限
+MAX_CONTEXT_DOC_CHARS = 800
+MAX_CONTEXT_CHARS = 4000
+
+# 最多保留的会话数及会话闲置过期时间
+MAX_SESSIONS = 10_000
+SESSION_TTL_SECONDS = 3600
+
+# 建议类别 -> 关键词
+SUGGESTION_KEYWORDS = {
+    "time": ("时间", "几点"),
+    "price": ("价格", "票价", "费用"),
+    "vehicle": ("车", "自行车"),
+    "art_island": ("直島", "豊島", "犬島"),
+}
+
+# 每个类别编译为一个命名分组，一次扫描即可由分组名得到命中的类别
+SUGGESTION_PATTERN = re.compile("|".join(
+    f"(?P<{category}>"
+    + "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    + ")"
+    for category, keywords in SUGGESTION_KEYWORDS.items()
+))
+
+# 类别 -> 建议（按输出顺序排列）
+CATEGORY_SUGGESTIONS = (
+    ("time", ("查看其他时间段的船班", "了解换乘信息")),
+    ("price", ("比较不同公司的票价", "查看儿童票价信息")),
+    ("vehicle", ("查看载运车辆的其他路线", "了解载运费用")),
+    ("art_island", ("规划艺术岛屿跳岛行程", "了解艺术展览信息")),
+)
+
+# 问题中除港口外决定答案的事实：数字（时间、人数、票价等）和时段、日期用语
+QUERY_FACT_PATTERN = re.compile(
+    r"[0-9零〇一二两三四五六七八九十百千半]+|上午|下午|早上|早晨|中午|晚上|傍晚|凌晨|今天|明天|后天|am|pm"
+)
+
+def _query_facts(query: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    提取问题中的事实：按出现顺序的港口名，以及数字和时段用语
+
+    措辞相近的问题只有事实完全相同时才能共用缓存，
+    "高松到直岛"与"直岛到高松"、8点与9点的问题向量几乎相同，答案却不同
+    """
+    normalized = unicodedata.normalize("NFKC", query).lower()
+    return tuple(vector_store.extract_ports(normalized)), tuple(QUERY_FACT_PATTERN.findall(normalized))
+
+def _trip_plan_response(trip_plan: Dict[str, Any], relevant_routes: List[Dict[str, Any]]) -> TripPlanResponse:
+    """
+    将Gemini生成的行程规划JSON转换为行程规划响应
+
+    Gemini的JSON字段类型不固定：非字典的行程项包装为{"description": ...}，费用、时长和建议转为字符串
+
+    Args:
+        trip_plan: Gemini返回的行程规划（无效JSON时为{"raw_response": 原始文本}）
+        relevant_routes: 检索到的相关航线文档
+
+    Returns:
+        行程规划响应
+    """
+    if not isinstance(trip_plan, dict):
+        # JSON顶层直接是行程列表
+        trip_plan = {"itinerary": trip_plan}
+
+    itinerary = trip_plan.get("itinerary")
+    recommendations = trip_plan.get("recommendations")
+    total_cost = trip_plan.get("total_cost")
+    total_duration = trip_plan.get("total_duration")
+
+    return TripPlanResponse(
+        itinerary=[
+            item if isinstance(item, dict) else {"description": str(item)}
+            for item in (itinerary if isinstance(itinerary, list) else [])
+        ],
+        total_cost=str(total_cost) if total_cost not in (None, "") else "待计算",
+        total_duration=str(total_duration) if total_duration not in (None, "") else "待计算",
+        recommendations=(
+            [str(item) for item in recommendations]
+            if isinstance(recommendations, list) and recommendations
+            else DEFAULT_TRIP_RECOMMENDATIONS
+        ),
+        relevant_routes=relevant_routes,
+        raw_plan=trip_plan.get("raw_response")
+    )
+
+@lru_cache(maxsize=2048)
+def _keyword_suggestions(query: str) -> Tuple[str, ...]:
+    """单次扫描查询文本，按命中的关键词类别生成建议，重复的查询直接返回缓存结果"""
+    hits = {match.lastgroup for match in SUGGESTION_PATTERN.finditer(query)}
+    return tuple(
+        suggestion
+        for category, category_suggestions in CATEGORY_SUGGESTIONS
+        if category in hits
+        for suggestion in category_suggestions
+    )
+
+@lru_cache(maxsize=256)
+def _join_context(doc_parts: Tuple[Tuple[str, str], ...]) -> str:
+    """拼接上下文，相同的检索结果组合直接复用已拼好的字符串"""
+    return "\n\n".join(f"[{doc_type}] {content}" for doc_type, content in doc_parts)
+
 class RAGEngine:
     """RAG查询引擎"""
     
     def __init__(self):
-        self.sessions = {}  # 存储会话状态
+        # 存储会话状态，按最近访问顺序排列；超出数量或闲置过期的会话会被淘汰
+        self.sessions: "OrderedDict[str, deque]" = OrderedDict()
+        self._session_last_access: Dict[str, float] = {}
+
+        # 检索结果的语义缓存：几乎相同且事实一致的问题复用上一次的检索结果
+        self.retrieval_cache = SemanticCache(threshold=0.97, max_entries=512, ttl_seconds=3600)
+
+        # 聊天响应的语义缓存：几乎相同的独立问题直接复用上一次的回复
+        self.response_cache = SemanticCache(threshold=0.97, max_entries=2048, ttl_seconds=3600)
+
+        # 知识库内容变更后，两种缓存中的结果都不再有效
+        vector_store.add_change_listener(self.clear_caches)
 
         # 初始化多层Agent系统
         self.multi_layer_system = MultiLayerAgentSystem(
@@ -31,7 +167,8 @@ class RAGEngine:
         self, 
         message: str, 
         session_id: Optional[str] = None,
-        context_history: Optional[List[ChatMessage]] = None
+        context_history: Optional[List[ChatMessage]] = None,
+        mode: Optional[str] = None
     ) -> ChatResponse:
         """
         处理聊天查询
@@ -40,6 +177,7 @@ class RAGEngine:
             message: 用户消息
             session_id: 会话ID
             context_history: 上下文历史
+            mode: 本次查询使用的模式（'multi_agent' 或 'legacy'），默认使用当前系统模式
             
         Returns:
             聊天响应
@@ -47,18 +185,60 @@ class RAGEngine:
         try:
             # 生成或使用现有会话ID
             if not session_id:
-                session_id = str(uuid.uuid4())
+                session_id = uuid.uuid4().hex
+
+            mode = self._resolve_mode(mode)
+
+            # 没有对话历史的独立问题才使用响应缓存，追问的回复依赖上下文
+            # 向量相似之外还要求模式和问题中的事实完全一致
+            query_embedding = None
+            query_facts = None
+            if not context_history and not self.sessions.get(session_id):
+                query_embedding = await self._embed_for_cache(message)
+                if query_embedding is not None:
+                    query_facts = _query_facts(message)
+                    cached = self.response_cache.get(
+                        query_embedding,
+                        accept=lambda value: value[0] == mode and value[1] == query_facts
+                    )
+                    if cached is not None:
+                        logger.info(f"Response cache hit for query: {message[:50]}...")
+                        return self._reuse_cached_response(message, session_id, cached[2])
 
             # 根据系统模式选择处理方式
-            if self.system_mode == 'multi_agent':
-                return await self._process_with_multi_agent(message, session_id, context_history)
+            if mode == 'multi_agent':
+                response = await self._process_with_multi_agent(message, session_id, context_history)
             else:
-                return await self._process_with_legacy(message, session_id, context_history)
+                response = await self._process_with_legacy(message, session_id, context_history, query_embedding)
+
+            if query_embedding is not None:
+                self.response_cache.put(query_embedding, (mode, query_facts, response.model_dump()))
+
+            return response
             
         except Exception as e:
             logger.error(f"Error in chat query: {str(e)}")
             raise
 
+    async def _embed_for_cache(self, message: str) -> Optional[List[float]]:
+        """计算用于响应缓存查找的查询向量，失败时返回None（不使用缓存）"""
+        try:
+            return await embedding_service.get_single_embedding(message)
+        except Exception as e:
+            logger.warning(f"跳过响应缓存: {str(e)}")
+            return None
+
+    def _reuse_cached_response(self, message: str, session_id: str, cached: Dict[str, Any]) -> ChatResponse:
+        """用缓存的回复构建本次响应，并记录到当前会话历史"""
+        response = ChatResponse.model_validate(cached)
+        response.session_id = session_id
+
+        session_history = self._get_session_history(session_id)
+        session_history.append(ChatMessage(role="user", content=message))
+        session_history.append(ChatMessage(role="assistant", content=response.message))
+
+        return response
+
     async def _process_with_multi_agent(self, message: str, session_id: str, context_history: Optional[List[ChatMessage]] = None) -> ChatResponse:
         """使用多层Agent系统处理查询"""
         try:
@@ -68,35 +248,29 @@ class RAGEngine:
             agent_result = await self.multi_layer_system.process_query(message, session_id)
 
             # 更新会话历史
-            if session_id not in self.sessions:
-                self.sessions[session_id] = []
-
-            session_history = self.sessions[session_id]
+            session_history = self._get_session_history(session_id)
             if context_history:
                 session_history.extend(context_history)
 
             session_history.append(ChatMessage(role="user", content=message))
             session_history.append(ChatMessage(role="assistant", content=agent_result["message"]))
 
-            # 保持会话历史在合理长度
-            if len(session_history) > 20:
-                session_history = session_history[-20:]
-
-            self.sessions[session_id] = session_history
-
             # 生成建议（基于传统方法）
             suggestions = self._generate_suggestions_from_agent_result(message, agent_result)
 
+            response_metadata = agent_result.get("response_metadata") or {}
+            agent_performance = agent_result.get("agent_performance") or []
+
             # 构建来源信息
-            sources = self._build_sources_from_agent_result(agent_result)
+            sources = self._build_sources_from_agent_result(agent_result, response_metadata, agent_performance)
 
             # 构建验证结果
             verification_result = {
                 "accuracy_rate": agent_result.get("accuracy_rate", 0.0),
-                "verified_facts": agent_result.get("response_metadata", {}).get("verified_facts_count", 0),
-                "total_facts": agent_result.get("response_metadata", {}).get("total_facts_count", 0),
-                "verification_summary": agent_result.get("response_metadata", {}).get("verification_summary", ""),
-                "agent_performance": agent_result.get("agent_performance", [])
+                "verified_facts": response_metadata.get("verified_facts_count", 0),
+                "total_facts": response_metadata.get("total_facts_count", 0),
+                "verification_summary": response_metadata.get("verification_summary", ""),
+                "agent_performance": agent_performance
             }
 
             return ChatResponse(
@@ -113,62 +287,62 @@ class RAGEngine:
             logger.info("降级到传统RAG方法")
             return await self._process_with_legacy(message, session_id, context_history)
 
-    async def _process_with_legacy(self, message: str, session_id: str, context_history: Optional[List[ChatMessage]] = None) -> ChatResponse:
+    async def _process_with_legacy(
+        self,
+        message: str,
+        session_id: str,
+        context_history: Optional[List[ChatMessage]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> ChatResponse:
         """使用传统RAG方法处理查询"""
         try:
             logger.info(f"使用传统RAG方法处理查询: {message}")
 
             # 获取或创建会话历史
-            if session_id not in self.sessions:
-                self.sessions[session_id] = []
-
-            session_history = self.sessions[session_id]
+            session_history = self._get_session_history(session_id)
             if context_history:
                 session_history.extend(context_history)
 
             # 1. 检索相关信息
-            relevant_docs = await self._retrieve_relevant_info(message)
+            relevant_docs = await self._retrieve_relevant_info(message, query_embedding=query_embedding)
 
             # 2. 构建上下文
             context = self._build_context(relevant_docs)
 
-            # 3. 生成回复
-            response_text = await gemini_service.generate_response(
+            # 3. 生成回复（等待模型期间并行准备建议和来源）
+            llm_task = asyncio.create_task(gemini_service.generate_response(
                 prompt=message,
                 context=context,
                 chat_history=session_history
-            )
+            ))
+
+            # 4. 生成建议
+            suggestions = self._generate_suggestions(message, relevant_docs)
 
-            # 4. 验证AI回复的准确性
-            verification_result = response_verifier.verify_response(response_text)
-            verification_message = response_verifier.format_verification_message(verification_result)
+            # 5. 构建来源
+            sources = [
+                Source(
+                    type=doc["metadata"].get("type", "unknown"),
+                    content=doc["document"][:200] + "..." if len(doc["document"]) > 200 else doc["document"],
+                    metadata=doc["metadata"]
+                )
+                for doc in islice(relevant_docs, MAX_SOURCES)
+            ]
+
+            response_text = await llm_task
+
+            # 6. 验证AI回复的准确性（CPU计算放到线程池，不阻塞事件循环）
+            verification_result, verification_message = await asyncio.to_thread(
+                response_verifier.verify_and_format, response_text
+            )
 
             # 将验证信息添加到回复中
             final_response = response_text + verification_message
 
-            # 5. 生成建议
-            suggestions = self._generate_suggestions(message, relevant_docs)
-
-            # 6. 更新会话历史
+            # 7. 更新会话历史
             session_history.append(ChatMessage(role="user", content=message))
             session_history.append(ChatMessage(role="assistant", content=final_response))
 
-            # 保持会话历史在合理长度
-            if len(session_history) > 20:
-                session_history = session_history[-20:]
-
-            self.sessions[session_id] = session_history
-
-            # 7. 构建响应
-            sources = [
-                {
-                    "type": doc["metadata"].get("type", "unknown"),
-                    "content": doc["document"][:200] + "..." if len(doc["document"]) > 200 else doc["document"],
-                    "metadata": doc["metadata"]
-                }
-                for doc in relevant_docs[:3]  # 只返回前3个来源
-            ]
-
             return ChatResponse(
                 message=final_response,
                 sources=sources,
@@ -181,6 +355,102 @@ class RAGEngine:
             logger.error(f"传统RAG处理失败: {str(e)}")
             raise
 
+    async def chat_query_stream(
+        self,
+        message: str,
+        session_id: Optional[str] = None,
+        context_history: Optional[List[ChatMessage]] = None,
+        mode: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式处理聊天查询
+        
+        Args:
+            message: 用户消息
+            session_id: 会话ID
+            context_history: 上下文历史
+            mode: 本次查询使用的模式（'multi_agent' 或 'legacy'），默认使用当前系统模式
+            
+        Yields:
+            回复文本片段，最后一段为验证信息
+        """
+        # 生成或使用现有会话ID
+        if not session_id:
+            session_id = uuid.uuid4().hex
+
+        mode = self._resolve_mode(mode)
+
+        # 多层Agent流程不支持逐块生成，整段回复作为单个片段返回
+        if mode == 'multi_agent':
+            response = await self._process_with_multi_agent(message, session_id, context_history)
+            yield response.message
+            return
+
+        # 获取或创建会话历史
+        session_history = self._get_session_history(session_id)
+        if context_history:
+            session_history.extend(context_history)
+
+        # 1. 检索相关信息并构建上下文
+        relevant_docs = await self._retrieve_relevant_info(message)
+        context = self._build_context(relevant_docs)
+
+        # 2. 流式生成回复
+        chunks = []
+        async for chunk in gemini_service.generate_response_stream(
+            prompt=message,
+            context=context,
+            chat_history=session_history
+        ):
+            chunks.append(chunk)
+            yield chunk
+
+        # 3. 完整回复生成后再验证准确性
+        response_text = "".join(chunks)
+        verification_result, verification_message = await asyncio.to_thread(
+            response_verifier.verify_and_format, response_text
+        )
+        yield verification_message
+
+        # 4. 更新会话历史
+        session_history.append(ChatMessage(role="user", content=message))
+        session_history.append(ChatMessage(role="assistant", content=response_text + verification_message))
+
+    def _resolve_mode(self, mode: Optional[str]) -> str:
+        """校验请求指定的系统模式，无效或未指定时使用当前系统模式"""
+        if mode and mode not in SYSTEM_MODES:
+            logger.warning(f"无效的系统模式: {mode}")
+            mode = None
+        return mode or self.system_mode
+
+    def _get_session_history(self, session_id: str) -> deque:
+        """获取或创建会话历史，同时淘汰闲置过期和超出数量上限的会话"""
+        now = time.monotonic()
+
+        # 最早访问的会话排在最前，遇到未过期的会话即可停止
+        while self.sessions:
+            oldest_id = next(iter(self.sessions))
+            if now - self._session_last_access[oldest_id] < SESSION_TTL_SECONDS:
+                break
+            self._drop_session(oldest_id)
+
+        session_history = self.sessions.get(session_id)
+        if session_history is None:
+            session_history = deque(maxlen=MAX_SESSION_HISTORY)
+            self.sessions[session_id] = session_history
+            while len(self.sessions) > MAX_SESSIONS:
+                self._drop_session(next(iter(self.sessions)))
+        else:
+            self.sessions.move_to_end(session_id)
+
+        self._session_last_access[session_id] = now
+        return session_history
+
+    def _drop_session(self, session_id: str):
+        """移除会话及其访问时间"""
+        del self.sessions[session_id]
+        del self._session_last_access[session_id]
+
     def _generate_suggestions_from_agent_result(self, query: str, agent_result: Dict[str, Any]) -> List[str]:
         """基于Agent结果生成建议"""
         suggestions = []
@@ -191,23 +461,7 @@ class RAGEngine:
             suggestions.append("建议查询官方网站获取最新信息")
 
         # 基于查询内容生成建议
-        query_lower = query.lower()
-
-        if "时间" in query or "几点" in query:
-            suggestions.append("查看其他时间段的船班")
-            suggestions.append("了解换乘信息")
-
-        if "价格" in query or "票价" in query or "费用" in query:
-            suggestions.append("比较不同公司的票价")
-            suggestions.append("查看儿童票价信息")
-
-        if "车" in query or "自行车" in query:
-            suggestions.append("查看载运车辆的其他路线")
-            suggestions.append("了解载运费用")
-
-        if any(island in query for island in ["直島", "豊島", "犬島"]):
-            suggestions.append("规划艺术岛屿跳岛行程")
-            suggestions.append("了解艺术展览信息")
+        suggestions.extend(_keyword_suggestions(query))
 
         # 基于Agent性能生成建议
         agent_performance = agent_result.get("agent_performance", [])
@@ -216,41 +470,51 @@ class RAGEngine:
 
         return suggestions[:4]
 
-    def _build_sources_from_agent_result(self, agent_result: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """基于Agent结果构建来源信息"""
+    def _build_sources_from_agent_result(
+        self,
+        agent_result: Dict[str, Any],
+        response_metadata: Dict[str, Any],
+        agent_performance: List[Dict[str, Any]]
+    ) -> List[Source]:
+        """基于Agent结果（及已取出的响应元数据和Agent性能数据）构建来源信息"""
         sources = []
 
         # 从Agent性能中提取来源信息
-        agent_performance = agent_result.get("agent_performance", [])
-
         for perf in agent_performance:
+            if len(sources) >= MAX_SOURCES:
+                break
             if perf.get("agent") == "DataRetrievalAgent" and perf.get("success"):
-                sources.append({
-                    "type": "multi_agent_retrieval",
-                    "content": f"多层Agent系统检索到 {perf.get('response_data', {}).get('retrieved_count', 0)} 条相关数据",
-                    "metadata": {
+                sources.append(Source(
+                    type="multi_agent_retrieval",
+                    content=f"多层Agent系统检索到 {perf.get('response_data', {}).get('retrieved_count', 0)} 条相关数据",
+                    metadata={
                         "agent": perf.get("agent"),
                         "execution_time": perf.get("execution_time", 0.0)
                     }
-                })
+                ))
 
         # 添加验证信息作为来源
-        verification_summary = agent_result.get("response_metadata", {}).get("verification_summary", "")
-        if verification_summary:
-            sources.append({
-                "type": "verification_result",
-                "content": verification_summary,
-                "metadata": {
+        verification_summary = response_metadata.get("verification_summary", "")
+        if verification_summary and len(sources) < MAX_SOURCES:
+            sources.append(Source(
+                type="verification_result",
+                content=verification_summary,
+                metadata={
                     "accuracy_rate": agent_result.get("accuracy_rate", 0.0),
-                    "verified_facts": agent_result.get("response_metadata", {}).get("verified_facts_count", 0)
+                    "verified_facts": response_metadata.get("verified_facts_count", 0)
                 }
-            })
+            ))
 
-        return sources[:3]  # 限制来源数量
+        return sources
+
+    def clear_caches(self):
+        """清空检索结果缓存和聊天响应缓存"""
+        self.retrieval_cache.clear()
+        self.response_cache.clear()
 
     def set_system_mode(self, mode: str):
         """设置系统模式"""
-        if mode in ['legacy', 'multi_agent']:
+        if mode in SYSTEM_MODES:
             self.system_mode = mode
             logger.info(f"系统模式已切换为: {mode}")
         else:
@@ -270,15 +534,34 @@ class RAGEngine:
                 "active_sessions": len(self.sessions)
             }
     
-    async def _retrieve_relevant_info(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """检索相关信息"""
+    async def _retrieve_relevant_info(
+        self,
+        query: str,
+        n_results: int = 5,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """检索相关信息，已计算过查询向量时直接复用"""
         try:
+            if query_embedding is None:
+                query_embedding = await embedding_service.get_single_embedding(query)
+
+            # 语义缓存命中且问题中的事实一致时跳过向量检索
+            query_facts = _query_facts(query)
+            cached = self.retrieval_cache.get(
+                query_embedding,
+                accept=lambda value: value[0] == n_results and value[1] == query_facts
+            )
+            if cached is not None:
+                logger.info(f"Retrieval cache hit for query: {query[:50]}...")
+                return cached[2]
+
             # 基础检索
-            results = await vector_store.search(query, n_results=n_results)
+            results = await vector_store.search_by_embedding(query_embedding, n_results=n_results)
             
             # 可以在这里添加更复杂的检索逻辑
             # 例如：重排序、过滤、多轮检索等
             
+            self.retrieval_cache.put(query_embedding, (n_results, query_facts, results))
             return results
             
         except Exception as e:
@@ -290,40 +573,27 @@ class RAGEngine:
         if not relevant_docs:
             return ""
         
-        context_parts = []
+        # 以(类型, 内容)元组为键缓存，文档ID在重建知识库后可能对应不同内容
+        doc_parts = []
+        total_chars = 0
         for doc in relevant_docs:
-            doc_type = doc["metadata"].get("type", "信息")
-            content = doc["document"]
-            context_parts.append(f"[{doc_type}] {content}")
+            if total_chars >= MAX_CONTEXT_CHARS:
+                break
+            content = doc["document"][:MAX_CONTEXT_DOC_CHARS]
+            doc_parts.append((doc["metadata"].get("type", "信息"), content))
+            total_chars += len(content)
         
-        return "\n\n".join(context_parts)
+        return _join_context(tuple(doc_parts))
     
     def _generate_suggestions(self, query: str, relevant_docs: List[Dict[str, Any]]) -> List[str]:
         """生成相关建议"""
         suggestions = []
         
         # 基于查询内容生成建议
-        query_lower = query.lower()
-        
-        if "时间" in query or "几点" in query:
-            suggestions.append("查看其他时间段的船班")
-            suggestions.append("了解换乘信息")
-        
-        if "价格" in query or "票价" in query or "费用" in query:
-            suggestions.append("比较不同公司的票价")
-            suggestions.append("查看儿童票价信息")
-        
-        if "车" in query or "自行车" in query:
-            suggestions.append("查看载运车辆的其他路线")
-            suggestions.append("了解载运费用")
-        
-        if any(island in query for island in ["直島", "豊島", "犬島"]):
-            suggestions.append("规划艺术岛屿跳岛行程")
-            suggestions.append("了解艺术展览信息")
+        suggestions.extend(_keyword_suggestions(query))
         
         # 基于检索结果生成建议
-        route_docs = [doc for doc in relevant_docs if doc["metadata"].get("type") == "route"]
-        if route_docs:
+        if any(doc["metadata"].get("type") == "route" for doc in relevant_docs):
             suggestions.append("查看相关路线的详细信息")
             suggestions.append("比较不同船运公司")
         
@@ -349,34 +619,37 @@ class RAGEngine:
         """
         try:
             # 1. 检索相关路线信息
-            all_locations = [departure] + destinations
+            # 地点去重（保持顺序），重复的目的地不会产生重复或起止相同的路线查询
+            all_locations = list(dict.fromkeys([departure] + destinations))
             route_queries = []
             
             for i in range(len(all_locations) - 1):
                 for j in range(i + 1, len(all_locations)):
                     route_queries.append(f"{all_locations[i]} 到 {all_locations[j]}")
             
-            relevant_routes = []
-            for query in route_queries:
-                routes = await vector_store.search(
-                    query, 
+            # 所有路线查询一次批量检索，同时使用Gemini生成行程规划（两者互不依赖）
+            route_results, trip_plan = await asyncio.gather(
+                vector_store.batch_search(
+                    route_queries,
                     n_results=3,
-                    filter_metadata={"type": "route"}
+                    collection_type="route"
+                ),
+                gemini_service.generate_trip_plan(
+                    departure, destinations, preferences
                 )
-                relevant_routes.extend(routes)
-            
-            # 2. 使用Gemini生成行程规划
-            trip_plan = await gemini_service.generate_trip_plan(
-                departure, destinations, preferences
             )
+            # 不同查询常命中同一路线文档，按文档ID去重
+            relevant_routes = []
+            seen_ids = set()
+            for routes in route_results:
+                for route in routes:
+                    if route["id"] not in seen_ids:
+                        seen_ids.add(route["id"])
+                        relevant_routes.append(route)
+            relevant_routes = relevant_routes[:MAX_TRIP_ROUTES]
             
-            # 3. 构建响应
-            return TripPlanResponse(
-                itinerary=[],  # 这里需要解析Gemini的响应
-                total_cost="待计算",
-                total_duration="待计算",
-                recommendations=["建议提前预订", "注意船班时间", "准备好相关证件"]
-            )
+            # 2. 构建响应
+            return _trip_plan_response(trip_plan, relevant_routes)
             
         except Exception as e:
             logger.error(f"Error planning trip: {str(e)}")
@@ -412,7 +685,7 @@ class RAGEngine:
             recommendations = await vector_store.search(
                 query, 
                 n_results=5,
-                filter_metadata={"type": "popular_route"}
+                collection_type="popular_route"
             )
             
             return [
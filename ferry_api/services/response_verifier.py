@@ -4,20 +4,80 @@ AI回复验证服务 - 验证AI回复中的具体信息是否准确
 """
 
 import re
+import copy
 import logging
-from typing import Dict, List, Any, Tuple
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
 from .data_processor import data_processor
 
 logger = logging.getLogger(__name__)
 
+# 时间格式：HH:MM
+TIME_PATTERN = re.compile(r'\b\d{1,2}:\d{2}\b')
+# 价格格式：数字+円
+PRICE_PATTERN = re.compile(r'\d+円')
+# 路线格式：地点→地点 时间-时间
+ROUTE_PATTERN = re.compile(r'([^→\s]+)→([^→\s]+)\s*(\d{1,2}:\d{2})-(\d{1,2}:\d{2})')
+
+# 验证时用到的路线字段
+ROUTE_FIELDS = ('departure_port', 'arrival_port', 'departure_time', 'arrival_time', 'company', 'adult_fare', 'child_fare')
+
+# 验证的公司名（按输出顺序排列）
+COMPANY_KEYWORDS = ('四国汽船', '豊島フェリー', '小豆島豊島フェリー', 'ジャンボフェリー', '四国フェリー', '国際両備フェリー', '雌雄島海運')
+# 零宽前瞻匹配每个位置开始的最长公司名，重叠和嵌套的出现都不会漏掉
+COMPANY_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(company) for company in sorted(COMPANY_KEYWORDS, key=len, reverse=True)) + "))"
+)
+# 公司名 -> 它包含的所有公司名（含自身）
+COMPANY_SUBSTRINGS = {
+    company: frozenset(other for other in COMPANY_KEYWORDS if other in company)
+    for company in COMPANY_KEYWORDS
+}
+
+# 不含任何可验证信息的回复的验证结果（与逐项验证空列表的结果相同）
+EMPTY_VERIFICATION = {
+    'detailed_verification': {
+        'times': {'verified': [], 'unverified': [], 'accuracy_rate': 0},
+        'prices': {'verified': [], 'unverified': [], 'accuracy_rate': 0},
+        'companies': {'verified': [], 'unverified': [], 'accuracy_rate': 0}
+    },
+    'verification_summary': {
+        'times_accuracy': 0,
+        'prices_accuracy': 0,
+        'companies_accuracy': 0
+    },
+    'verified_info_count': 0,
+    'total_info_count': 0,
+    'overall_accuracy': 1.0
+}
+
 class ResponseVerifier:
     """AI回复验证器"""
     
-    def __init__(self):
+    def __init__(self, routes_data: Optional[List[Dict[str, Any]]] = None):
         self.routes_data = None
         self.ports_data = None
         self.companies_data = None
-        self.load_data()
+        # 路线字段按列存放（字段名 -> 各路线的值）
+        self._route_columns: Dict[str, Tuple[Any, ...]] = {}
+        # 验证用索引：时间/票价 -> 首条匹配路线的位置，公司 -> 路线数，港口对 -> 路线位置
+        self._time_index: Dict[str, int] = {}
+        self._fare_index: Dict[str, int] = {}
+        self._company_counts: Counter = Counter()
+        self._port_pair_positions: Dict[Tuple[str, str], List[int]] = {}
+        # 验证结果只取决于回复文本和已加载的数据，相同回复直接复用结果
+        self._verify_cached = lru_cache(maxsize=256)(self._verify_response_impl)
+        
+        if routes_data is None:
+            self.load_data()
+        else:
+            # 直接使用给定的路线数据（批量验证的工作进程）
+            self.routes_data = routes_data
+            self.ports_data = []
+            self.companies_data = []
+            self._build_indexes()
     
     def load_data(self):
         """加载验证数据"""
@@ -31,41 +91,61 @@ class ResponseVerifier:
             self.routes_data = []
             self.ports_data = []
             self.companies_data = []
+        
+        self._build_indexes()
+        self._verify_cached.cache_clear()
+    
+    def _build_indexes(self):
+        """遍历一次路线数据构建验证索引，验证时按键查找而不再逐条扫描"""
+        self._route_columns = {
+            field: tuple(route.get(field) for route in self.routes_data)
+            for field in ROUTE_FIELDS
+        }
+        columns = self._route_columns
+        
+        self._time_index = {}
+        self._fare_index = {}
+        self._port_pair_positions = {}
+        
+        for position in range(len(self.routes_data)):
+            # 保留数据中第一条匹配的路线，与逐条扫描时的结果一致
+            self._time_index.setdefault(columns['departure_time'][position], position)
+            self._time_index.setdefault(columns['arrival_time'][position], position)
+            self._fare_index.setdefault(columns['adult_fare'][position], position)
+            self._fare_index.setdefault(columns['child_fare'][position], position)
+            
+            port_pair = (columns['departure_port'][position], columns['arrival_port'][position])
+            self._port_pair_positions.setdefault(port_pair, []).append(position)
+        
+        self._company_counts = Counter(company for company in columns['company'] if company)
+    
+    def _route_label(self, position: int) -> str:
+        """路线的"出发港 → 到达港"描述"""
+        columns = self._route_columns
+        return f"{columns['departure_port'][position]} → {columns['arrival_port'][position]}"
     
     def extract_time_info(self, text: str) -> List[str]:
         """提取文本中的时间信息"""
-        # 匹配时间格式：HH:MM
-        time_pattern = r'\b\d{1,2}:\d{2}\b'
-        times = re.findall(time_pattern, text)
-        return times
+        return TIME_PATTERN.findall(text)
     
     def extract_price_info(self, text: str) -> List[str]:
         """提取文本中的价格信息"""
-        # 匹配价格格式：数字+円
-        price_pattern = r'\d+円'
-        prices = re.findall(price_pattern, text)
-        return prices
+        return PRICE_PATTERN.findall(text)
     
     def extract_company_info(self, text: str) -> List[str]:
         """提取文本中的公司信息"""
-        companies = []
-        company_keywords = ['四国汽船', '豊島フェリー', '小豆島豊島フェリー', 'ジャンボフェリー', '四国フェリー', '国際両備フェリー', '雌雄島海運']
-        
-        for company in company_keywords:
-            if company in text:
-                companies.append(company)
+        # 一次扫描得到每个位置上最长的公司名，再补上被它包含的公司名
+        found = set()
+        for match in COMPANY_PATTERN.finditer(text):
+            found.update(COMPANY_SUBSTRINGS[match.group(1)])
         
-        return companies
+        return [company for company in COMPANY_KEYWORDS if company in found]
     
     def extract_route_info(self, text: str) -> List[Dict[str, str]]:
         """提取文本中的路线信息"""
         routes = []
         
-        # 匹配路线格式：地点→地点 时间-时间
-        route_pattern = r'([^→\s]+)→([^→\s]+)\s*(\d{1,2}:\d{2})-(\d{1,2}:\d{2})'
-        matches = re.findall(route_pattern, text)
-        
-        for match in matches:
+        for match in ROUTE_PATTERN.findall(text):
             routes.append({
                 'departure': match[0].strip(),
                 'arrival': match[1].strip(),
@@ -73,9 +153,6 @@ class ResponseVerifier:
                 'arrival_time': match[3]
             })
         
-        # 也匹配其他格式
-        route_pattern2 = r'([^→\s]+).*?(\d{1,2}:\d{2}).*?([^→\s]+).*?(\d{1,2}:\d{2})'
-        
         return routes
     
     def verify_time_info(self, times: List[str]) -> Dict[str, Any]:
@@ -84,19 +161,14 @@ class ResponseVerifier:
         unverified_times = []
         
         for time_str in times:
-            found = False
-            for route in self.routes_data:
-                if (route.get('departure_time') == time_str or 
-                    route.get('arrival_time') == time_str):
-                    verified_times.append({
-                        'time': time_str,
-                        'route': f"{route.get('departure_port')} → {route.get('arrival_port')}",
-                        'company': route.get('company')
-                    })
-                    found = True
-                    break
-            
-            if not found:
+            position = self._time_index.get(time_str)
+            if position is not None:
+                verified_times.append({
+                    'time': time_str,
+                    'route': self._route_label(position),
+                    'company': self._route_columns['company'][position]
+                })
+            else:
                 unverified_times.append(time_str)
         
         return {
@@ -111,19 +183,14 @@ class ResponseVerifier:
         unverified_prices = []
         
         for price_str in prices:
-            found = False
-            for route in self.routes_data:
-                if (route.get('adult_fare') == price_str or 
-                    route.get('child_fare') == price_str):
-                    verified_prices.append({
-                        'price': price_str,
-                        'route': f"{route.get('departure_port')} → {route.get('arrival_port')}",
-                        'company': route.get('company')
-                    })
-                    found = True
-                    break
-            
-            if not found:
+            position = self._fare_index.get(price_str)
+            if position is not None:
+                verified_prices.append({
+                    'price': price_str,
+                    'route': self._route_label(position),
+                    'company': self._route_columns['company'][position]
+                })
+            else:
                 unverified_prices.append(price_str)
         
         return {
@@ -137,17 +204,10 @@ class ResponseVerifier:
         verified_companies = []
         unverified_companies = []
         
-        # 获取数据库中的所有公司
-        db_companies = set()
-        for route in self.routes_data:
-            company = route.get('company', '')
-            if company:
-                db_companies.add(company)
-        
         for company in companies:
-            if company in db_companies:
-                # 统计该公司的路线数量
-                route_count = sum(1 for route in self.routes_data if route.get('company') == company)
+            # 数据库中该公司的路线数量，不存在时为0
+            route_count = self._company_counts.get(company, 0)
+            if route_count:
                 verified_companies.append({
                     'company': company,
                     'route_count': route_count
@@ -165,32 +225,33 @@ class ResponseVerifier:
         """验证具体路线信息"""
         matching_routes = []
         
-        for route in self.routes_data:
-            dep_port = route.get('departure_port', '')
-            arr_port = route.get('arrival_port', '')
+        # 港口匹配（支持部分匹配）只需在不同的港口对上判断一次，再按原顺序取出对应路线
+        positions = sorted(
+            position
+            for (dep_port, arr_port), pair_positions in self._port_pair_positions.items()
+            if (departure in dep_port or dep_port in departure) and (arrival in arr_port or arr_port in arrival)
+            for position in pair_positions
+        )
+        
+        columns = self._route_columns
+        for position in positions:
+            route_match = {
+                'departure_port': columns['departure_port'][position],
+                'arrival_port': columns['arrival_port'][position],
+                'departure_time': columns['departure_time'][position],
+                'arrival_time': columns['arrival_time'][position],
+                'company': columns['company'][position],
+                'adult_fare': columns['adult_fare'][position],
+                'time_match': True
+            }
             
-            # 检查港口匹配（支持部分匹配）
-            dep_match = departure in dep_port or dep_port in departure
-            arr_match = arrival in arr_port or arr_port in arrival
+            # 如果指定了时间，检查时间匹配
+            if dep_time:
+                route_match['time_match'] = route_match['departure_time'] == dep_time
+            if arr_time and route_match['time_match']:
+                route_match['time_match'] = route_match['arrival_time'] == arr_time
             
-            if dep_match and arr_match:
-                route_match = {
-                    'departure_port': dep_port,
-                    'arrival_port': arr_port,
-                    'departure_time': route.get('departure_time'),
-                    'arrival_time': route.get('arrival_time'),
-                    'company': route.get('company'),
-                    'adult_fare': route.get('adult_fare'),
-                    'time_match': True
-                }
-                
-                # 如果指定了时间，检查时间匹配
-                if dep_time:
-                    route_match['time_match'] = route.get('departure_time') == dep_time
-                if arr_time and route_match['time_match']:
-                    route_match['time_match'] = route.get('arrival_time') == arr_time
-                
-                matching_routes.append(route_match)
+            matching_routes.append(route_match)
         
         return {
             'found_routes': matching_routes,
@@ -199,7 +260,11 @@ class ResponseVerifier:
         }
     
     def verify_response(self, ai_response: str) -> Dict[str, Any]:
-        """验证AI回复的完整性和准确性"""
+        """验证AI回复的完整性和准确性，返回缓存结果的副本，调用方可自由修改"""
+        return copy.deepcopy(self._verify_cached(ai_response))
+    
+    def _verify_response_impl(self, ai_response: str) -> Dict[str, Any]:
+        """执行验证"""
         verification_result = {
             'original_response': ai_response,
             'verification_summary': {},
@@ -215,6 +280,11 @@ class ResponseVerifier:
             prices = self.extract_price_info(ai_response)
             companies = self.extract_company_info(ai_response)
             
+            # 没有任何可验证信息时（如闲聊回复）直接使用预先构建的空结果
+            if not (times or prices or companies):
+                verification_result.update(EMPTY_VERIFICATION)
+                return verification_result
+            
             # 验证各类信息
             time_verification = self.verify_time_info(times)
             price_verification = self.verify_price_info(prices)
@@ -249,6 +319,29 @@ class ResponseVerifier:
         
         return verification_result
     
+    def verify_batch(self, responses: List[str], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        多进程批量验证回复（如离线质量审计）
+        
+        Args:
+            responses: 要验证的回复列表
+            max_workers: 工作进程数，默认为CPU核数
+            
+        Returns:
+            与输入顺序一致的验证结果列表
+        """
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_batch_worker,
+            initargs=(self.routes_data,)
+        ) as executor:
+            return list(executor.map(_verify_in_batch_worker, responses, chunksize=32))
+    
+    def verify_and_format(self, ai_response: str) -> Tuple[Dict[str, Any], str]:
+        """验证AI回复并生成验证消息，便于在线程池中一次完成"""
+        verification_result = self.verify_response(ai_response)
+        return verification_result, self.format_verification_message(verification_result)
+    
     def format_verification_message(self, verification_result: Dict[str, Any]) -> str:
         """格式化验证结果为用户友好的消息"""
         if verification_result['total_info_count'] == 0:
@@ -258,33 +351,45 @@ class ResponseVerifier:
         verified_count = verification_result['verified_info_count']
         total_count = verification_result['total_info_count']
         
-        message = f"\n\n📋 信息验证结果：{verified_count}/{total_count} 项信息已验证 (准确率: {accuracy*100:.1f}%)"
+        parts = [f"\n\n📋 信息验证结果：{verified_count}/{total_count} 项信息已验证 (准确率: {accuracy*100:.1f}%)"]
         
         # 详细验证信息
         details = verification_result['detailed_verification']
         
         if details['times']['verified']:
-            message += f"\n✅ 已验证时间: {', '.join([t['time'] for t in details['times']['verified']])}"
+            parts.append(f"\n✅ 已验证时间: {', '.join([t['time'] for t in details['times']['verified']])}")
         
         if details['times']['unverified']:
-            message += f"\n⚠️  未验证时间: {', '.join(details['times']['unverified'])}"
+            parts.append(f"\n⚠️  未验证时间: {', '.join(details['times']['unverified'])}")
         
         if details['prices']['verified']:
-            message += f"\n✅ 已验证票价: {', '.join([p['price'] for p in details['prices']['verified']])}"
+            parts.append(f"\n✅ 已验证票价: {', '.join([p['price'] for p in details['prices']['verified']])}")
         
         if details['prices']['unverified']:
-            message += f"\n⚠️  未验证票价: {', '.join(details['prices']['unverified'])}"
+            parts.append(f"\n⚠️  未验证票价: {', '.join(details['prices']['unverified'])}")
         
         if details['companies']['verified']:
-            message += f"\n✅ 已验证公司: {', '.join([c['company'] for c in details['companies']['verified']])}"
+            parts.append(f"\n✅ 已验证公司: {', '.join([c['company'] for c in details['companies']['verified']])}")
         
         if details['companies']['unverified']:
-            message += f"\n⚠️  未验证公司: {', '.join(details['companies']['unverified'])}"
+            parts.append(f"\n⚠️  未验证公司: {', '.join(details['companies']['unverified'])}")
         
         if accuracy < 0.8:
-            message += f"\n\n⚠️  建议：部分信息未能验证，请在出行前查询官方网站确认最新信息。"
+            parts.append("\n\n⚠️  建议：部分信息未能验证，请在出行前查询官方网站确认最新信息。")
         
-        return message
+        return "".join(parts)
+
+# 批量验证工作进程中的验证器，由进程初始化函数创建
+_batch_worker_verifier: Optional[ResponseVerifier] = None
+
+def _init_batch_worker(routes_data: List[Dict[str, Any]]):
+    """工作进程启动时用传入的路线数据构建一次验证索引"""
+    global _batch_worker_verifier
+    _batch_worker_verifier = ResponseVerifier(routes_data)
+
+def _verify_in_batch_worker(ai_response: str) -> Dict[str, Any]:
+    """在工作进程中验证单条回复"""
+    return _batch_worker_verifier.verify_response(ai_response)
 
 # 全局实例
 response_verifier = ResponseVerifier()
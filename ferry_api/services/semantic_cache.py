@@ -0,0 +1,131 @@
+"""
+语义缓存 - 按向量余弦相似度命中的近似缓存
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """基于余弦相似度的LRU缓存，条目按TTL过期；存取的向量须为单位向量"""
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 512, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # 槽位 -> (缓存值, 过期时间)，按LRU顺序排列
+        self._entries: OrderedDict = OrderedDict()
+
+        # 向量存放在预分配的连续矩阵中，查找时直接扫描已用槽位，无需每次重新拼接
+        self._matrix: Optional[np.ndarray] = None
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self._free_slots: List[int] = []
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        embedding: List[float],
+        accept: Optional[Callable[[Any], bool]] = None
+    ) -> Optional[Any]:
+        """
+        查找与给定向量足够相似的缓存值
+
+        Args:
+            embedding: 查询向量（单位向量）
+            accept: 对相似条目的额外校验，返回False时视为未命中
+
+        Returns:
+            命中时返回缓存值，否则返回None
+        """
+        self._evict_expired()
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        used = self._used
+
+        # 单位向量的点积即余弦相似度
+        similarities = self._matrix[:used] @ query
+        similarities[~self._occupied[:used]] = -np.inf
+        best = int(np.argmax(similarities))
+
+        value = self._entries[best][0]
+        if similarities[best] < self.threshold or (accept is not None and not accept(value)):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best)
+        return value
+
+    def put(self, embedding: List[float], value: Any):
+        """
+        写入缓存
+
+        Args:
+            embedding: 向量（单位向量）
+            value: 缓存值
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        slot = self._allocate_slot()
+        self._matrix[slot] = vector
+        self._occupied[slot] = True
+        self._entries[slot] = (value, time.monotonic() + self.ttl_seconds)
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._occupied[:] = False
+        self._free_slots.clear()
+        self._used = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _allocate_slot(self) -> int:
+        """分配空闲槽位，缓存已满时淘汰最久未使用的条目"""
+        if self._free_slots:
+            return self._free_slots.pop()
+        if self._used < self.max_entries:
+            self._used += 1
+            return self._used - 1
+
+        slot, _ = self._entries.popitem(last=False)
+        return slot
+
+    def _release_slot(self, slot: int):
+        """移除条目并回收槽位"""
+        del self._entries[slot]
+        self._occupied[slot] = False
+        self._free_slots.append(slot)
+
+    def _evict_expired(self):
+        """移除已过期的条目"""
+        now = time.monotonic()
+        expired = [slot for slot, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for slot in expired:
+            self._release_slot(slot)
@@ -1,21 +1,64 @@
 import os
-import uuid
+import re
+import json
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import unicodedata
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import chromadb
 from chromadb.config import Settings
 from services.embedding_service import embedding_service
+from services.response_cache import ResponseCache
+from services.port_vocabulary import load_port_terms, normalize_place_text
 
 logger = logging.getLogger(__name__)
 
+# 知识库文档类型，每种类型另建一个集合，按类型检索时无需元数据后过滤
+DOCUMENT_TYPES = ("route", "port", "company", "popular_route", "system_info")
+
+# 查询结果缓存：知识库更新时整体失效，因此TTL可以设得较长
+QUERY_CACHE_MAX_ENTRIES = 512
+QUERY_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
 class VectorStore:
     """ChromaDB向量数据库服务"""
     
     def __init__(self, persist_directory: str = "./chroma_db"):
         self.persist_directory = persist_directory
-        self.client = None
-        self.collection = None
-        self._initialize_client()
+        # ChromaDB客户端在首次访问时才打开，仅导入模块不会加载持久化索引
+        self._client = None
+        self._collection = None
+        self._collections: Dict[str, Any] = {}  # 文档类型 -> 该类型的集合
+        # 规范化查询文本 + 检索参数 -> 检索结果
+        self._query_cache = ResponseCache(
+            max_entries=QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=QUERY_CACHE_TTL_SECONDS
+        )
+        self._port_terms: Optional[Dict[str, Tuple[str, ...]]] = None  # 地名 -> 航线中的港口名
+        self._port_pattern: Optional[re.Pattern] = None  # 所有地名的正则选择式
+        # 知识库内容变更时的回调，依赖检索结果的缓存（如RAG引擎的缓存）在此注册
+        self._change_listeners: List[Callable[[], None]] = []
+    
+    @property
+    def client(self):
+        """ChromaDB客户端"""
+        if self._client is None:
+            self._initialize_client()
+        return self._client
+    
+    @property
+    def collection(self):
+        """总集合"""
+        if self._client is None:
+            self._initialize_client()
+        return self._collection
+    
+    @property
+    def collections(self) -> Dict[str, Any]:
+        """按文档类型分区的集合"""
+        if self._client is None:
+            self._initialize_client()
+        return self._collections
     
     def _initialize_client(self):
         """初始化ChromaDB客户端"""
@@ -24,7 +67,7 @@ class VectorStore:
             os.makedirs(self.persist_directory, exist_ok=True)
             
             # 创建持久化客户端
-            self.client = chromadb.PersistentClient(
+            client = chromadb.PersistentClient(
                 path=self.persist_directory,
                 settings=Settings(
                     anonymized_telemetry=False,
@@ -33,12 +76,22 @@ class VectorStore:
             )
             
             # 获取或创建集合
-            self.collection = self.client.get_or_create_collection(
+            self._collection = client.get_or_create_collection(
                 name="ferry_knowledge",
                 metadata={"description": "瀬户内海船班知识库"}
             )
             
-            logger.info(f"ChromaDB initialized with {self.collection.count()} documents")
+            # 按文档类型分区的集合
+            self._collections = {
+                doc_type: client.get_or_create_collection(
+                    name=f"ferry_knowledge_{doc_type}",
+                    metadata={"description": f"瀬户内海船班知识库（{doc_type}）"}
+                )
+                for doc_type in DOCUMENT_TYPES
+            }
+            self._client = client
+            
+            logger.info(f"ChromaDB initialized with {self._collection.count()} documents")
             
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB: {str(e)}")
@@ -62,23 +115,49 @@ class VectorStore:
             文档ID列表
         """
         try:
-            # 生成ID（如果未提供）
+            # 生成ID（如果未提供）：由内容决定，重复导入同一文档时覆盖而不是新增
             if not ids:
-                ids = [str(uuid.uuid4()) for _ in documents]
+                ids = [self._document_id(document, metadata) for document, metadata in zip(documents, metadatas)]
+            
+            # 同一批内的重复ID只保留首次出现的文档
+            all_ids = ids
+            first_positions: Dict[str, int] = {}
+            for i, doc_id in enumerate(ids):
+                first_positions.setdefault(doc_id, i)
+            if len(first_positions) < len(ids):
+                positions = list(first_positions.values())
+                documents = [documents[i] for i in positions]
+                metadatas = [metadatas[i] for i in positions]
+                ids = [ids[i] for i in positions]
             
             # 获取向量表示
             embeddings = await embedding_service.get_embeddings(documents)
             
-            # 添加到ChromaDB
-            self.collection.add(
+            # 写入ChromaDB
+            self.collection.upsert(
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids,
                 embeddings=embeddings
             )
             
+            # 同时写入对应类型的集合
+            partitions: Dict[str, List[int]] = {}
+            for i, metadata in enumerate(metadatas):
+                if metadata.get("type") in self.collections:
+                    partitions.setdefault(metadata["type"], []).append(i)
+            
+            for doc_type, indices in partitions.items():
+                self.collections[doc_type].upsert(
+                    documents=[documents[i] for i in indices],
+                    metadatas=[metadatas[i] for i in indices],
+                    ids=[ids[i] for i in indices],
+                    embeddings=[embeddings[i] for i in indices]
+                )
+            
+            self._content_changed()
             logger.info(f"Added {len(documents)} documents to vector store")
-            return ids
+            return all_ids
             
         except Exception as e:
             logger.error(f"Error adding documents: {str(e)}")
@@ -88,7 +167,8 @@ class VectorStore:
         self, 
         query: str, 
         n_results: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        collection_type: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         搜索相关文档
@@ -97,30 +177,44 @@ class VectorStore:
             query: 查询文本
             n_results: 返回结果数量
             filter_metadata: 元数据过滤条件
+            collection_type: 文档类型，指定时只在该类型的集合中检索
             
         Returns:
             搜索结果列表
         """
         try:
+            port_filter = self._port_filter(query) if collection_type == "route" else None
+            params = json.dumps(
+                [n_results, filter_metadata, collection_type, port_filter],
+                ensure_ascii=False,
+                sort_keys=True
+            )
+            cache_key = ResponseCache.make_key(self._normalize_query(query), params)
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # 获取查询向量
             query_embedding = await embedding_service.get_single_embedding(query)
             
-            # 执行搜索
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=filter_metadata
-            )
-            
-            # 格式化结果
+            # 执行搜索；查询中提到港口时只在相关航线中检索，无结果再退回全量检索
             formatted_results = []
-            for i in range(len(results['ids'][0])):
-                formatted_results.append({
-                    'id': results['ids'][0][i],
-                    'document': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i] if 'distances' in results else None
-                })
+            if port_filter:
+                formatted_results = await self.search_by_embedding(
+                    query_embedding,
+                    n_results=n_results,
+                    filter_metadata={"$and": [filter_metadata, port_filter]} if filter_metadata else port_filter,
+                    collection_type=collection_type
+                )
+            if not formatted_results:
+                formatted_results = await self.search_by_embedding(
+                    query_embedding,
+                    n_results=n_results,
+                    filter_metadata=filter_metadata,
+                    collection_type=collection_type
+                )
+            
+            self._query_cache.put(cache_key, formatted_results)
             
             logger.info(f"Found {len(formatted_results)} relevant documents for query: {query[:50]}...")
             return formatted_results
@@ -129,6 +223,171 @@ class VectorStore:
             logger.error(f"Error searching documents: {str(e)}")
             raise
     
+    async def search_by_embedding(
+        self, 
+        query_embedding: List[float], 
+        n_results: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        collection_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        使用已计算好的查询向量搜索相关文档
+        
+        Args:
+            query_embedding: 查询向量
+            n_results: 返回结果数量
+            filter_metadata: 元数据过滤条件
+            collection_type: 文档类型，指定时只在该类型的集合中检索
+            
+        Returns:
+            搜索结果列表
+        """
+        collection, where = self._resolve_collection(collection_type, filter_metadata)
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where
+        )
+        
+        return self._format_results(results, 0)
+    
+    async def batch_search(
+        self, 
+        queries: List[str], 
+        n_results: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        collection_type: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        批量搜索相关文档，所有查询一次向量化、一次检索
+        
+        Args:
+            queries: 查询文本列表
+            n_results: 每个查询返回结果数量
+            filter_metadata: 元数据过滤条件
+            collection_type: 文档类型，指定时只在该类型的集合中检索
+            
+        Returns:
+            与查询一一对应的搜索结果列表
+        """
+        if not queries:
+            return []
+        
+        try:
+            query_embeddings = await embedding_service.get_embeddings(queries)
+            
+            collection, where = self._resolve_collection(collection_type, filter_metadata)
+            results = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where
+            )
+            
+            batch_results = [self._format_results(results, i) for i in range(len(queries))]
+            
+            logger.info(f"Batch searched {len(queries)} queries")
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"Error batch searching documents: {str(e)}")
+            raise
+    
+    @staticmethod
+    def _document_id(document: str, metadata: Dict[str, Any]) -> str:
+        """由文档内容和元数据生成确定性ID"""
+        content = document + "\0" + json.dumps(metadata, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """规范化查询文本（全角/半角统一、去除首尾空白、小写）"""
+        return unicodedata.normalize("NFKC", query).strip().lower()
+    
+    @property
+    def port_terms(self) -> Dict[str, Tuple[str, ...]]:
+        """地名 -> 航线数据中的港口名"""
+        if self._port_terms is None:
+            try:
+                self._port_terms = load_port_terms()
+            except OSError as e:
+                logger.warning(f"Port data unavailable, port prefilter disabled: {str(e)}")
+                self._port_terms = {}
+            # 长的地名排在前面，"小豆島土庄"优先于"小豆島"匹配
+            if self._port_terms:
+                self._port_pattern = re.compile(
+                    "|".join(map(re.escape, sorted(self._port_terms, key=len, reverse=True)))
+                )
+        return self._port_terms
+    
+    def extract_ports(self, text: str) -> List[str]:
+        """一次扫描找出文本中提到的地名（按出现顺序，地名的简体写法也能识别）"""
+        if not self.port_terms:
+            return []
+        return self._port_pattern.findall(normalize_place_text(text))
+    
+    def _port_filter(self, query: str) -> Optional[Dict[str, Any]]:
+        """根据查询中出现的地名生成航线文档的元数据过滤条件，未出现地名时返回None"""
+        ports = sorted({port for term in self.extract_ports(query) for port in self.port_terms[term]})
+        if not ports:
+            return None
+        return {"$or": [{"departure_port": {"$in": ports}}, {"arrival_port": {"$in": ports}}]}
+    
+    def add_change_listener(self, callback: Callable[[], None]):
+        """注册知识库内容变更（添加、更新、删除文档）时调用的回调"""
+        self._change_listeners.append(callback)
+    
+    def get_query_cache_stats(self) -> Dict[str, Any]:
+        """获取查询结果缓存的统计信息"""
+        return self._query_cache.get_stats()
+    
+    def clear_query_cache(self):
+        """清空查询结果缓存"""
+        self._query_cache.clear()
+    
+    def _content_changed(self):
+        """知识库内容已变更：清空本地查询缓存并通知所有依赖方"""
+        self.clear_query_cache()
+        for callback in self._change_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in vector store change listener: {str(e)}")
+    
+    def _resolve_collection(
+        self, 
+        collection_type: Optional[str], 
+        filter_metadata: Optional[Dict[str, Any]]
+    ) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """
+        确定检索使用的集合及过滤条件
+        
+        类型集合为空时（例如分区前建立的知识库）退回总集合并按type过滤
+        """
+        collection = self.collections.get(collection_type) if collection_type else None
+        if collection is not None and collection.count() > 0:
+            return collection, filter_metadata
+        
+        if collection_type:
+            type_filter = {"type": collection_type}
+            if filter_metadata:
+                filter_metadata = {"$and": [type_filter, filter_metadata]}
+            else:
+                filter_metadata = type_filter
+        return self.collection, filter_metadata
+    
+    def _format_results(self, results: Dict[str, Any], query_index: int) -> List[Dict[str, Any]]:
+        """格式化第query_index个查询的检索结果"""
+        formatted_results = []
+        for i in range(len(results['ids'][query_index])):
+            formatted_results.append({
+                'id': results['ids'][query_index][i],
+                'document': results['documents'][query_index][i],
+                'metadata': results['metadatas'][query_index][i],
+                'distance': results['distances'][query_index][i] if 'distances' in results else None
+            })
+        
+        return formatted_results
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """获取集合统计信息"""
         try:
@@ -153,6 +412,9 @@ class VectorStore:
         """删除集合（用于重置）"""
         try:
             self.client.delete_collection(name="ferry_knowledge")
+            for doc_type in DOCUMENT_TYPES:
+                self.client.delete_collection(name=f"ferry_knowledge_{doc_type}")
+            self._content_changed()
             logger.info("Collection deleted successfully")
         except Exception as e:
             logger.error(f"Error deleting collection: {str(e)}")
@@ -174,6 +436,15 @@ class VectorStore:
                 embeddings=[embedding]
             )
             
+            if metadata.get("type") in self.collections:
+                self.collections[metadata["type"]].update(
+                    ids=[doc_id],
+                    documents=[document],
+                    metadatas=[metadata],
+                    embeddings=[embedding]
+                )
+            
+            self._content_changed()
             logger.info(f"Updated document {doc_id}")
             
         except Exception as e:
@@ -0,0 +1,119 @@
+"""
+知识库文档测试 - 各类文档的文本和元数据与逐行模板格式化的结果一致
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+FERRY_API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(FERRY_API_DIR))
+
+# 数据处理器依赖向量数据库
+HAS_CHROMADB = importlib.util.find_spec("chromadb") is not None
+
+ROUTE_TEMPLATE = """
+船班路线：{departure_port} 到 {arrival_port}
+出发时间：{departure_time}
+到达时间：{arrival_time}
+船运公司：{company}
+船只类型：{ship_type}
+大人票价：{adult_fare}
+小人票价：{child_fare}
+运营日期：{operating_days}
+车辆载运：{vehicles}
+自行车载运：{bicycles}
+备注：{notes}
+""".strip()
+
+PORT_TEMPLATE = """
+港口名称：{name}
+所属岛屿：{island}
+地址：{address}
+港口特色：{features}
+连接岛屿：{connections}
+""".strip()
+
+COMPANY_TEMPLATE = """
+船运公司：{name}
+联系电话：{phone}
+官方网站：{website}
+主要航线：{main_routes}
+备注信息：{notes}
+""".strip()
+
+POPULAR_ROUTE_TEMPLATE = """
+热门跳岛路线：{departure} 到 {arrival}
+路线描述：{description}
+推荐理由：这是一条受欢迎的跳岛路线，适合游客体验瀬户内海的魅力。
+""".strip()
+
+def read_rows(filename):
+    """按原始CSV逐行读取（不指定列类型）"""
+    return pd.read_csv(FERRY_API_DIR / "data" / filename).to_dict('records')
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb is not installed")
+class DocumentTextTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from services.data_processor import DataProcessor
+
+        # 数据文件路径相对于ferry_api目录
+        cwd = os.getcwd()
+        os.chdir(FERRY_API_DIR)
+        cls.addClassCleanup(os.chdir, cwd)
+
+        cls.processor = DataProcessor()
+        cls.processor.load_data()
+
+    def test_route_documents(self):
+        rows = read_rows("ferry_routes.csv")
+        documents, metadatas = self.processor.create_route_documents()
+        self.assertEqual(documents, [
+            ROUTE_TEMPLATE.format(
+                **row,
+                vehicles='允许' if row['allows_vehicles'] else '不允许',
+                bicycles='允许' if row['allows_bicycles'] else '不允许'
+            )
+            for row in rows
+        ])
+        self.assertEqual(
+            [(metadata['type'], metadata['departure_port'], metadata['departure_time'], metadata['company']) for metadata in metadatas],
+            [('route', row['departure_port'], row['departure_time'], row['company']) for row in rows]
+        )
+
+    def test_port_documents(self):
+        rows = read_rows("ports.csv")
+        documents, metadatas = self.processor.create_port_documents()
+        self.assertEqual(documents, [PORT_TEMPLATE.format(**row) for row in rows])
+        self.assertEqual([metadata['name'] for metadata in metadatas], [row['name'] for row in rows])
+
+    def test_company_documents(self):
+        rows = read_rows("companies.csv")
+        documents, metadatas = self.processor.create_company_documents()
+        self.assertEqual(documents, [COMPANY_TEMPLATE.format(**row) for row in rows])
+        self.assertEqual([metadata['name'] for metadata in metadatas], [row['name'] for row in rows])
+
+    def test_popular_route_documents(self):
+        with open(FERRY_API_DIR / "data" / "popular_routes.json", encoding="utf-8") as f:
+            routes = json.load(f)
+        documents, metadatas = self.processor.create_popular_route_documents()
+        self.assertEqual(documents, [POPULAR_ROUTE_TEMPLATE.format(**route) for route in routes])
+        self.assertEqual(metadatas[0]['type'], 'popular_route')
+
+    def test_returned_lists_are_copies(self):
+        documents, metadatas = self.processor.create_popular_route_documents()
+        documents.clear()
+        metadatas[0]['type'] = 'modified'
+
+        documents, metadatas = self.processor.create_popular_route_documents()
+        self.assertTrue(documents)
+        self.assertEqual(metadatas[0]['type'], 'popular_route')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+港口词表测试 - 港口信息表中的每个港口都能对应到航线数据中的港口
+"""
+
+import csv
+import sys
+import unittest
+from pathlib import Path
+
+FERRY_API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(FERRY_API_DIR))
+
+from services.port_vocabulary import build_port_terms, load_route_ports, match_route_port
+
+PORTS_PATH = FERRY_API_DIR / "data" / "ports.csv"
+ROUTES_PATH = FERRY_API_DIR / "data" / "ferry_routes.csv"
+
+class PortVocabularyTest(unittest.TestCase):
+    def setUp(self):
+        self.route_ports = load_route_ports(str(ROUTES_PATH))
+        with open(PORTS_PATH, encoding="utf-8") as f:
+            self.port_rows = list(csv.DictReader(f))
+        self.terms = build_port_terms(self.port_rows, self.route_ports)
+
+    def test_every_port_maps_to_a_route_port(self):
+        for row in self.port_rows:
+            with self.subTest(port=row["name"]):
+                self.assertIn(match_route_port(row["name"], self.route_ports), self.route_ports)
+
+    def test_port_name_without_suffix_is_a_term(self):
+        for row in self.port_rows:
+            with self.subTest(port=row["name"]):
+                port = match_route_port(row["name"], self.route_ports)
+                self.assertIn(port, self.terms[row["name"].removesuffix("港")])
+
+    def test_island_term_covers_all_its_ports(self):
+        self.assertEqual(set(self.terms["直島"]), {"直島宮浦", "直島本村"})
+        self.assertEqual(set(self.terms["新岡山"]), {"新岡山港"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+"""
+回复验证器测试 - 索引查找与逐条扫描路线数据的结果一致，批量验证与逐条验证的结果一致
+"""
+
+import importlib.util
+import sys
+import unittest
+from pathlib import Path
+
+FERRY_API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(FERRY_API_DIR))
+
+# 验证器通过数据处理器加载航线数据，数据处理器依赖向量数据库
+HAS_CHROMADB = importlib.util.find_spec("chromadb") is not None
+
+SAMPLE_REPLIES = [
+    "宇野→豊島家浦 06:45-07:25，小豆島豊島フェリー运营，成人780円，儿童390円。",
+    "高松到直島可以乘坐四国汽船，08:12出发，票价520円。",
+    "直岛很适合骑自行车游览。",
+    "ジャンボフェリー 01:00 发船，99999円，另有雌雄島海運。",
+    "豊島フェリー和小豆島豊島フェリー都有船班，12:55 出发。",
+]
+
+def scan_first_route(routes, fields, value):
+    """逐条扫描路线数据，返回第一条任一字段等于value的路线（参照实现）"""
+    return next((route for route in routes if any(route.get(field) == value for field in fields)), None)
+
+def scan_verification(routes, values, fields, key):
+    """按逐条扫描的方式验证时间或票价（参照实现）"""
+    verified, unverified = [], []
+    for value in values:
+        route = scan_first_route(routes, fields, value)
+        if route is None:
+            unverified.append(value)
+        else:
+            verified.append({
+                key: value,
+                'route': f"{route.get('departure_port')} → {route.get('arrival_port')}",
+                'company': route.get('company')
+            })
+    return {'verified': verified, 'unverified': unverified, 'accuracy_rate': len(verified) / len(values) if values else 0}
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb is not installed")
+class VerifierLookupTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from services.response_verifier import response_verifier
+        cls.verifier = response_verifier
+        cls.routes = response_verifier.routes_data
+
+    def test_time_and_price_lookup_matches_scan(self):
+        for reply in SAMPLE_REPLIES:
+            with self.subTest(reply=reply):
+                times = self.verifier.extract_time_info(reply)
+                prices = self.verifier.extract_price_info(reply)
+                self.assertEqual(
+                    self.verifier.verify_time_info(times),
+                    scan_verification(self.routes, times, ('departure_time', 'arrival_time'), 'time')
+                )
+                self.assertEqual(
+                    self.verifier.verify_price_info(prices),
+                    scan_verification(self.routes, prices, ('adult_fare', 'child_fare'), 'price')
+                )
+
+    def test_lookup_returns_first_matching_route(self):
+        # 07:25 既是宇野→豊島家浦的到达时间，也是豊島家浦→豊島唐櫃的出发时间
+        verified = self.verifier.verify_time_info(["07:25"])['verified']
+        self.assertEqual(verified[0]['route'], "宇野 → 豊島家浦")
+
+    def test_company_route_counts_match_scan(self):
+        companies = ['四国汽船', '豊島フェリー', '小豆島豊島フェリー', '不存在の汽船']
+        result = self.verifier.verify_company_info(companies)
+        for item in result['verified']:
+            with self.subTest(company=item['company']):
+                self.assertEqual(item['route_count'], sum(1 for route in self.routes if route.get('company') == item['company']))
+        self.assertEqual(result['unverified'], ['不存在の汽船'])
+
+    def test_specific_route_matches_scan(self):
+        cases = [("高松", "直島", None), ("宇野", "豊島", "06:45"), ("直島宮浦", "高松", None), ("神戸", "犬島", None)]
+        for departure, arrival, dep_time in cases:
+            with self.subTest(departure=departure, arrival=arrival):
+                expected = [
+                    route for route in self.routes
+                    if (departure in route['departure_port'] or route['departure_port'] in departure)
+                    and (arrival in route['arrival_port'] or route['arrival_port'] in arrival)
+                ]
+                result = self.verifier.verify_specific_route(departure, arrival, dep_time)
+                self.assertEqual(
+                    [(route['departure_port'], route['arrival_port'], route['departure_time']) for route in result['found_routes']],
+                    [(route['departure_port'], route['arrival_port'], route['departure_time']) for route in expected]
+                )
+                if dep_time:
+                    self.assertEqual(result['exact_match'], any(route['departure_time'] == dep_time for route in expected))
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb is not installed")
+class ExplicitRoutesTest(unittest.TestCase):
+    """批量验证的工作进程直接用给定的路线数据构建验证器"""
+
+    ROUTES = [
+        {'departure_port': '高松', 'arrival_port': '直島宮浦', 'departure_time': '08:12', 'arrival_time': '09:02',
+         'company': '四国汽船', 'adult_fare': '520円', 'child_fare': '260円'},
+        {'departure_port': '直島宮浦', 'arrival_port': '高松', 'departure_time': '09:02', 'arrival_time': '10:00',
+         'company': '四国汽船', 'adult_fare': '520円', 'child_fare': '260円'},
+        {'departure_port': '宇野', 'arrival_port': '直島本村', 'departure_time': '07:25', 'arrival_time': '07:45',
+         'company': '四国汽船', 'adult_fare': '300円', 'child_fare': '150円'},
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        from services.response_verifier import ResponseVerifier
+        cls.verifier = ResponseVerifier([dict(route) for route in cls.ROUTES])
+
+    def test_lookups_match_scan(self):
+        times = ['08:12', '09:02', '10:00', '07:45', '11:11']
+        prices = ['520円', '260円', '150円', '999円']
+        self.assertEqual(
+            self.verifier.verify_time_info(times),
+            scan_verification(self.ROUTES, times, ('departure_time', 'arrival_time'), 'time')
+        )
+        self.assertEqual(
+            self.verifier.verify_price_info(prices),
+            scan_verification(self.ROUTES, prices, ('adult_fare', 'child_fare'), 'price')
+        )
+        self.assertEqual(self.verifier.verify_company_info(['四国汽船'])['verified'], [{'company': '四国汽船', 'route_count': 3}])
+
+    def test_specific_route(self):
+        result = self.verifier.verify_specific_route("直島", "高松", "09:02")
+        self.assertEqual(result['route_count'], 1)
+        self.assertTrue(result['exact_match'])
+        self.assertEqual(result['found_routes'][0]['arrival_time'], '10:00')
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb is not installed")
+class NoFactsReplyTest(unittest.TestCase):
+    """不含时间、票价和公司名的回复跳过逐项验证"""
+
+    REPLY = "直岛很适合骑自行车游览。"
+
+    @classmethod
+    def setUpClass(cls):
+        from services.response_verifier import response_verifier
+        cls.verifier = response_verifier
+
+    def test_matches_full_verification_of_empty_lists(self):
+        times = self.verifier.verify_time_info([])
+        prices = self.verifier.verify_price_info([])
+        companies = self.verifier.verify_company_info([])
+        expected = {
+            'original_response': self.REPLY,
+            'detailed_verification': {'times': times, 'prices': prices, 'companies': companies},
+            'verification_summary': {
+                'times_accuracy': times['accuracy_rate'],
+                'prices_accuracy': prices['accuracy_rate'],
+                'companies_accuracy': companies['accuracy_rate']
+            },
+            'verified_info_count': 0,
+            'total_info_count': 0,
+            'overall_accuracy': 1.0
+        }
+        self.assertEqual(self.verifier.verify_response(self.REPLY), expected)
+
+    def test_result_can_be_modified_by_caller(self):
+        result = self.verifier.verify_response(self.REPLY)
+        result['detailed_verification']['times']['verified'].append({'time': '08:00'})
+        result['verification_summary']['times_accuracy'] = 1
+
+        again = self.verifier.verify_response("另一条" + self.REPLY)
+        self.assertEqual(again['detailed_verification']['times']['verified'], [])
+        self.assertEqual(again['verification_summary']['times_accuracy'], 0)
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb is not installed")
+class VerifyBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from services.response_verifier import response_verifier
+        cls.verifier = response_verifier
+
+    def test_batch_matches_single_verification_in_order(self):
+        responses = SAMPLE_REPLIES * 3 + list(reversed(SAMPLE_REPLIES))
+        expected = [self.verifier.verify_response(response) for response in responses]
+        self.assertEqual(self.verifier.verify_batch(responses, max_workers=2), expected)
+
+    def test_empty_batch(self):
+        self.assertEqual(self.verifier.verify_batch([], max_workers=1), [])
+
+@unittest.skipUnless(HAS_CHROMADB, "chromadb is not installed")
+class CompanyExtractionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from services.response_verifier import COMPANY_KEYWORDS, response_verifier
+        cls.keywords = COMPANY_KEYWORDS
+        cls.verifier = response_verifier
+
+    def test_matches_per_keyword_substring_check(self):
+        texts = SAMPLE_REPLIES + [
+            "小豆島豊島フェリー",
+            "四国フェリー和四国汽船",
+            "国際両備フェリー国際両備フェリー",
+            "雌雄島海運ジャンボフェリー豊島フェリー",
+            "没有公司名",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    self.verifier.extract_company_info(text),
+                    [company for company in self.keywords if company in text]
+                )
+
+    def test_nested_company_names_are_all_reported(self):
+        self.assertEqual(
+            self.verifier.extract_company_info("乘坐小豆島豊島フェリー"),
+            ['豊島フェリー', '小豆島豊島フェリー']
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+航线搜索测试 - 倒排索引过滤与逐行子串匹配（不区分大小写）的结果一致
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FERRY_API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(FERRY_API_DIR))
+
+from app.core.data_loader import DataLoader, data_loader
+from app.models.route import RouteSearchParams
+from app.services.route_service import route_service
+
+# 列名 -> 对应的倒排索引属性
+INDEXED_COLUMNS = {
+    '出发地': 'departure_index',
+    '到达地': 'arrival_index',
+    '运营公司': 'company_index',
+}
+
+def contains_mask(column: pd.Series, term: str) -> np.ndarray:
+    """逐行子串匹配的参照实现"""
+    return column.str.contains(term, case=False, na=False, regex=False).to_numpy()
+
+class IndexMaskTest(unittest.TestCase):
+    def setUp(self):
+        self.df = data_loader.timetable_df
+
+    def test_matches_substring_filter_on_timetable(self):
+        for column, index_name in INDEXED_COLUMNS.items():
+            values = self.df[column].dropna().unique().tolist()
+            # 完整值、部分值（如“直島”匹配直島宮浦和直島本村）和不存在的值
+            terms = values + [value[:2] for value in values] + ["島", "フェリー", "不存在的港口"]
+            for term in terms:
+                with self.subTest(column=column, term=term):
+                    mask = route_service._index_mask(getattr(data_loader, index_name), term, len(self.df))
+                    np.testing.assert_array_equal(mask, contains_mask(self.df[column], term))
+
+    def test_partial_names_match_every_containing_value(self):
+        ports = set(self.df.loc[route_service._index_mask(data_loader.departure_index, "直島", len(self.df)), '出发地'])
+        self.assertEqual(ports, {"直島宮浦", "直島本村"})
+
+        companies = set(self.df.loc[route_service._index_mask(data_loader.company_index, "豊島フェリー", len(self.df)), '运营公司'])
+        self.assertEqual(companies, {"豊島フェリー", "小豆島豊島フェリー"})
+
+    def test_case_insensitive_and_missing_values(self):
+        column = pd.Series(["Kobe", "高松東港", None, "高松", "KOBE"])
+        index = DataLoader._build_inverted_index(column)
+        for term in ["高松", "kobe", "KoBe", "東港", "none", "nan"]:
+            with self.subTest(term=term):
+                np.testing.assert_array_equal(
+                    route_service._index_mask(index, term, len(column)),
+                    contains_mask(column, term)
+                )
+
+class SearchRoutesTest(unittest.TestCase):
+    def test_combined_filters_match_substring_filter(self):
+        df = data_loader.timetable_df
+        params = RouteSearchParams(departure="高松", arrival="島", company="四国", limit=100)
+        expected = (
+            contains_mask(df['出发地'], "高松")
+            & contains_mask(df['到达地'], "島")
+            & contains_mask(df['运营公司'], "四国")
+        )
+
+        routes, total = route_service.search_routes(params)
+        self.assertEqual(total, int(expected.sum()))
+        self.assertEqual(
+            [(route.departure_port, route.arrival_port, route.departure_time) for route in routes],
+            [tuple(row) for row in df.loc[expected, ['出发地', '到达地', '出发时间']].head(100).itertuples(index=False)]
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+语义缓存测试 - 相似度阈值、额外校验和命中统计
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+FERRY_API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(FERRY_API_DIR))
+
+from services.semantic_cache import SemanticCache
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.97, max_entries=4, ttl_seconds=60)
+        self.cache.put([1.0, 0.0], ("高松", "直島"))
+
+    def test_similar_vector_hits(self):
+        self.assertEqual(self.cache.get([0.99, 0.14]), ("高松", "直島"))
+        self.assertIsNone(self.cache.get([0.0, 1.0]))
+
+    def test_rejected_entry_counts_as_miss(self):
+        self.assertIsNone(self.cache.get([1.0, 0.0], accept=lambda value: value[1] == "小豆島"))
+        self.assertEqual(self.cache.get([1.0, 0.0], accept=lambda value: value[1] == "直島"), ("高松", "直島"))
+
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_empty_cache_counts_as_miss(self):
+        self.cache.clear()
+        self.assertIsNone(self.cache.get([1.0, 0.0]))
+        self.assertEqual(self.cache.get_stats()["misses"], 1)
+        self.assertEqual(len(self.cache), 0)
+
+if __name__ == "__main__":
+    unittest.main()
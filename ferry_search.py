@@ -5,18 +5,48 @@
 Setouchi Island Hopping Ferry Search System
 """
 
+import numpy as np
 import pandas as pd
 import sys
 from datetime import datetime
 
+def parse_minutes(value):
+    """将"HH:MM"格式的时间转换为从零点起的分钟数"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def confirm_more(remaining):
+    """询问是否继续显示剩余的结果"""
+    try:
+        answer = input(f"\n还有 {remaining} 条记录，输入 y 继续显示: ")
+    except EOFError:
+        return False
+    return answer.strip().lower() == 'y'
+
 class FerrySearchSystem:
+    """船班查询系统；查询方法返回的DataFrame只供读取，可能与内部数据表共享"""
+    
     def __init__(self):
         """初始化船班查询系统"""
         try:
             self.timetable = pd.read_csv('setouchi_ferry_timetable.csv')
+            # 出发时间预先换算为分钟数，按时间段搜索时做整数比较
+            self._departure_minutes = np.array(
+                [parse_minutes(t) for t in self.timetable['出发时间']], dtype=np.int32
+            )
+            # 取值重复度高的列存为分类类型，子串匹配只需在去重后的类别上计算
+            for column in ('出发地', '到达地', '运营公司', '船只类型'):
+                self.timetable[column] = self.timetable[column].astype('category')
             self.companies = pd.read_csv('ferry_companies_info.csv')
             self.ports = pd.read_csv('ports_info.csv')
             self.fares = pd.read_csv('fare_summary.csv')
+            
+            # 公司、港口、票价表的名称列，查询时按查询词缓存匹配到的行位置
+            self._company_names = self.companies['公司名称'].fillna('').astype(str).tolist()
+            self._port_names = self.ports['港口名称'].fillna('').astype(str).tolist()
+            self._fare_departures = self.fares['出发地'].fillna('').astype(str).tolist()
+            self._fare_arrivals = self.fares['到达地'].fillna('').astype(str).tolist()
+            self._lookup_cache = {}
             print("瀬户内海船班查询系统已启动！")
             print("Setouchi Ferry Search System Initialized!")
         except FileNotFoundError as e:
@@ -25,71 +55,89 @@ class FerrySearchSystem:
     
     def search_routes(self, departure=None, arrival=None, company=None):
         """搜索航线"""
-        result = self.timetable.copy()
+        # 各条件合并为一个布尔掩码，只做一次索引；按普通子串匹配，不走正则
+        mask = np.ones(len(self.timetable), dtype=bool)
         
-        if departure:
-            result = result[result['出发地'].str.contains(departure, na=False)]
+        for value, column in ((departure, '出发地'), (arrival, '到达地'), (company, '运营公司')):
+            if value:
+                mask &= self.timetable[column].str.contains(value, na=False, regex=False).to_numpy()
         
-        if arrival:
-            result = result[result['到达地'].str.contains(arrival, na=False)]
-        
-        if company:
-            result = result[result['运营公司'].str.contains(company, na=False)]
-        
-        return result
+        return self.timetable.loc[mask]
+    
+    def _lookup(self, column, names, value):
+        """返回names中包含value的行位置，同一查询词只扫描一次"""
+        key = (column, value)
+        positions = self._lookup_cache.get(key)
+        if positions is None:
+            positions = self._lookup_cache[key] = [i for i, name in enumerate(names) if value in name]
+        return positions
     
     def get_company_info(self, company_name=None):
         """获取船运公司信息"""
         if company_name:
-            return self.companies[self.companies['公司名称'].str.contains(company_name, na=False)]
+            return self.companies.iloc[self._lookup('公司名称', self._company_names, company_name)]
         return self.companies
     
     def get_port_info(self, port_name=None):
         """获取港口信息"""
         if port_name:
-            return self.ports[self.ports['港口名称'].str.contains(port_name, na=False)]
+            return self.ports.iloc[self._lookup('港口名称', self._port_names, port_name)]
         return self.ports
     
     def search_by_time(self, departure_time_start=None, departure_time_end=None):
-        """按时间搜索"""
-        result = self.timetable.copy()
+        """按时间搜索，时间格式为HH:MM"""
+        mask = np.ones(len(self.timetable), dtype=bool)
         
         if departure_time_start:
-            result = result[result['出发时间'] >= departure_time_start]
+            mask &= self._departure_minutes >= parse_minutes(departure_time_start)
         
         if departure_time_end:
-            result = result[result['出发时间'] <= departure_time_end]
+            mask &= self._departure_minutes <= parse_minutes(departure_time_end)
         
-        return result
+        return self.timetable.loc[mask]
     
     def get_fare_info(self, departure=None, arrival=None):
         """获取票价信息"""
-        result = self.fares.copy()
+        if not departure and not arrival:
+            return self.fares
         
+        positions = range(len(self._fare_departures))
         if departure:
-            result = result[result['出发地'].str.contains(departure, na=False)]
-        
+            positions = self._lookup('出发地', self._fare_departures, departure)
         if arrival:
-            result = result[result['到达地'].str.contains(arrival, na=False)]
+            matched = set(self._lookup('到达地', self._fare_arrivals, arrival))
+            positions = [i for i in positions if i in matched]
         
-        return result
+        return self.fares.iloc[positions]
     
-    def display_results(self, results, title="搜索结果"):
-        """显示搜索结果"""
+    def display_results(self, results, title="搜索结果", page_size=20):
+        """显示搜索结果，每次显示page_size条，其余按需继续显示"""
         print(f"\n=== {title} ===")
         if results.empty:
             print("没有找到匹配的结果")
             return
         
         print(f"找到 {len(results)} 条记录：")
-        for idx, row in results.iterrows():
-            print(f"\n{idx+1}. {row['出发地']} → {row['到达地']}")
-            print(f"   时间: {row['出发时间']} → {row['到达时间']}")
-            print(f"   公司: {row['运营公司']}")
-            print(f"   船型: {row['船只类型']}")
-            print(f"   票价: 大人{row['大人票价']} / 小人{row['小人票价']}")
-            if pd.notna(row['备注']) and row['备注']:
-                print(f"   备注: {row['备注']}")
+        columns = ['出发地', '到达地', '出发时间', '到达时间', '运营公司', '船只类型', '大人票价', '小人票价', '备注']
+        rows = results[columns]
+        for start in range(0, len(rows), page_size):
+            lines = []
+            for row in rows.iloc[start:start + page_size].itertuples(name=None):
+                idx, departure, arrival, dep_time, arr_time, company, ship_type, adult_fare, child_fare, note = row
+                lines.append(f"\n{idx+1}. {departure} → {arrival}")
+                lines.append(f"   时间: {dep_time} → {arr_time}")
+                lines.append(f"   公司: {company}")
+                lines.append(f"   船型: {ship_type}")
+                lines.append(f"   票价: 大人{adult_fare} / 小人{child_fare}")
+                if pd.notna(note) and note:
+                    lines.append(f"   备注: {note}")
+            
+            # 每页整体拼接后一次输出
+            print("\n".join(lines))
+            
+            remaining = len(rows) - start - page_size
+            if remaining > 0 and not confirm_more(remaining):
+                break
     
     def interactive_search(self):
         """交互式搜索"""
@@ -121,10 +169,14 @@ class FerrySearchSystem:
         elif choice == "3":
             start_time = input("请输入开始时间 (格式: HH:MM, 可留空): ").strip()
             end_time = input("请输入结束时间 (格式: HH:MM, 可留空): ").strip()
-            results = self.search_by_time(
-                start_time if start_time else None,
-                end_time if end_time else None
-            )
+            try:
+                results = self.search_by_time(
+                    start_time if start_time else None,
+                    end_time if end_time else None
+                )
+            except ValueError:
+                print("时间格式无效，请使用 HH:MM 格式")
+                return True
             self.display_results(results, f"时间段: {start_time or '00:00'} - {end_time or '23:59'}")
         
         elif choice == "4":
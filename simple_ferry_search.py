@@ -8,10 +8,29 @@ Setouchi Island Hopping Ferry Search System - Simple Version
 import csv
 import sys
 
+# 热门路线（出发地, 目的地）
+POPULAR_ROUTES = (
+    ("高松", "直島"),
+    ("宇野", "直島"),
+    ("高松", "小豆島"),
+    ("宇野", "豊島"),
+    ("直島", "豊島"),
+    ("豊島", "犬島")
+)
+
+def confirm_more(remaining):
+    """询问是否继续显示剩余的结果"""
+    try:
+        answer = input(f"\n还有 {remaining} 条记录，输入 y 继续显示: ")
+    except EOFError:
+        return False
+    return answer.strip().lower() == 'y'
+
 class SimpleFerrySearch:
     def __init__(self):
         """初始化船班查询系统"""
         self.timetable = []
+        self._popular_cache = None  # (出发地, 目的地) -> 前3个船班，首次显示时生成
         self.load_timetable()
         print("瀬户内海船班查询系统已启动！")
         print("Setouchi Ferry Search System Initialized!")
@@ -22,6 +41,10 @@ class SimpleFerrySearch:
             with open('setouchi_ferry_timetable.csv', 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
                 self.timetable = list(reader)
+            # 搜索用的列按列存放，逐列过滤时不必对每行做字典查找
+            self._departures = [route['出发地'] for route in self.timetable]
+            self._arrivals = [route['到达地'] for route in self.timetable]
+            self._companies = [route['运营公司'] for route in self.timetable]
             print(f"成功加载 {len(self.timetable)} 条船班记录")
         except FileNotFoundError:
             print("错误：找不到 setouchi_ferry_timetable.csv 文件")
@@ -29,42 +52,44 @@ class SimpleFerrySearch:
     
     def search_routes(self, departure=None, arrival=None, company=None):
         """搜索航线"""
-        results = []
+        indices = range(len(self.timetable))
         
-        for route in self.timetable:
-            match = True
-            
-            if departure and departure not in route['出发地']:
-                match = False
-            
-            if arrival and arrival not in route['到达地']:
-                match = False
-            
-            if company and company not in route['运营公司']:
-                match = False
-            
-            if match:
-                results.append(route)
+        if departure:
+            indices = [i for i in indices if departure in self._departures[i]]
+        
+        if arrival:
+            indices = [i for i in indices if arrival in self._arrivals[i]]
+        
+        if company:
+            indices = [i for i in indices if company in self._companies[i]]
         
-        return results
+        return [self.timetable[i] for i in indices]
     
-    def display_results(self, results, title="搜索结果"):
-        """显示搜索结果"""
+    def display_results(self, results, title="搜索结果", page_size=20):
+        """显示搜索结果，每次显示page_size条，其余按需继续显示"""
         print(f"\n=== {title} ===")
         if not results:
             print("没有找到匹配的结果")
             return
         
         print(f"找到 {len(results)} 条记录：")
-        for i, route in enumerate(results, 1):
-            print(f"\n{i}. {route['出发地']} → {route['到达地']}")
-            print(f"   时间: {route['出发时间']} → {route['到达时间']}")
-            print(f"   公司: {route['运营公司']}")
-            print(f"   船型: {route['船只类型']}")
-            print(f"   票价: 大人{route['大人票价']} / 小人{route['小人票价']}")
-            print(f"   载车: {route['允许车辆']} / 载自行车: {route['允许自行车']}")
-            if route['备注']:
-                print(f"   备注: {route['备注']}")
+        for start in range(0, len(results), page_size):
+            lines = []
+            for i, route in enumerate(results[start:start + page_size], start + 1):
+                lines.append(f"\n{i}. {route['出发地']} → {route['到达地']}")
+                lines.append(f"   时间: {route['出发时间']} → {route['到达时间']}")
+                lines.append(f"   公司: {route['运营公司']}")
+                lines.append(f"   船型: {route['船只类型']}")
+                lines.append(f"   票价: 大人{route['大人票价']} / 小人{route['小人票价']}")
+                lines.append(f"   载车: {route['允许车辆']} / 载自行车: {route['允许自行车']}")
+                if route['备注']:
+                    lines.append(f"   备注: {route['备注']}")
+            
+            print("\n".join(lines))
+            
+            remaining = len(results) - start - page_size
+            if remaining > 0 and not confirm_more(remaining):
+                break
     
     def interactive_search(self):
         """交互式搜索"""
@@ -108,21 +133,17 @@ class SimpleFerrySearch:
     
     def show_popular_routes(self):
         """显示热门路线"""
-        popular_routes = [
-            ("高松", "直島"),
-            ("宇野", "直島"),
-            ("高松", "小豆島"),
-            ("宇野", "豊島"),
-            ("直島", "豊島"),
-            ("豊島", "犬島")
-        ]
+        if self._popular_cache is None:
+            self._popular_cache = {
+                (departure, arrival): self.search_routes(departure, arrival)[:3]  # 只显示前3个结果
+                for departure, arrival in POPULAR_ROUTES
+            }
         
         print("\n=== 热门路线 ===")
-        for departure, arrival in popular_routes:
+        for (departure, arrival), results in self._popular_cache.items():
             print(f"\n--- {departure} → {arrival} ---")
-            results = self.search_routes(departure, arrival)
             if results:
-                for route in results[:3]:  # 只显示前3个结果
+                for route in results:
                     print(f"  {route['出发时间']} → {route['到达时间']} ({route['运营公司']})")
             else:
                 print("  暂无直达航线")